@@ -0,0 +1,233 @@
+"""File containing the performance statistics kept up to date during a backtest."""
+import math
+
+import numpy as np
+
+class PerformanceStatistics(object):
+    """PerformanceStatistics keeps the performance metrics of a portfolio up to date as each period is
+    recorded and each fill is booked, so they can be read at any point of a run without a pass over the
+    equity time series. The mean and variance of the period returns are kept with Welford's algorithm.
+
+    Trade statistics count every fill which realized a profit or loss, that is every fill reducing or
+    closing a position.
+
+    Attributes:
+        initial_equity (float): The total value of the portfolio before the first period.
+        periods_per_year (float): The number of periods in a year, used to annualize the ratios.
+        periods (int): The number of periods recorded so far.
+        equity (float): The latest total value of the portfolio.
+        mean_return (float): The mean of the period returns.
+        peak (float): The highest total value so far.
+        max_drawdown (float): The largest drop from a peak so far, as a fraction of the peak.
+        drawdown_duration (int): The number of periods since the latest peak.
+        max_drawdown_duration (int): The longest number of periods spent below a peak so far.
+        exposed_periods (int): The number of periods ended with open positions.
+        traded_value (float): The total value traded.
+        wins (int): The number of fills realizing a profit.
+        losses (int): The number of fills realizing a loss.
+        gross_profit (float): The total profit of the winning fills.
+        gross_loss (float): The total loss of the losing fills, as a positive number.
+    """
+    def __init__(self, initial_equity: float, periods_per_year: float = 252):
+        """Constructor method
+
+        Args:
+            initial_equity (float): The total value of the portfolio before the first period.
+            periods_per_year (float, optional): The number of periods in a year, such as 252 for daily bars. Defaults to 252.
+        """
+        self.initial_equity = initial_equity
+        self.periods_per_year = periods_per_year
+
+        self.periods = 0
+        self.equity = initial_equity
+
+        # Running moments of the period returns
+        self.mean_return = 0.0
+        self.squared_deviations = 0.0
+        self.downside_squares = 0.0
+
+        # Running mean of the equity, the base of the turnover
+        self.mean_equity = 0.0
+
+        self.peak = initial_equity
+        self.max_drawdown = 0.0
+        self.drawdown_duration = 0
+        self.max_drawdown_duration = 0
+
+        self.exposed_periods = 0
+        self.gross_exposure = 0.0
+        self.traded_value = 0.0
+
+        self.wins = 0
+        self.losses = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.largest_win = 0.0
+        self.largest_loss = 0.0
+
+    def update_period(self, equity: float, gross_value: float = 0.0):
+        """Updates the statistics with the total value of the portfolio at the end of a period. Called by
+        Portfolio.record.
+
+        Args:
+            equity (float): The total value of the portfolio.
+            gross_value (float, optional): The total absolute market value of the open positions. Defaults to 0.0.
+        """
+        previous = self.equity
+        period_return = equity / previous - 1 if previous else 0.0
+        self.equity = equity
+        self.periods += 1
+        n = self.periods
+
+        delta = period_return - self.mean_return
+        self.mean_return += delta / n
+        self.squared_deviations += delta * (period_return - self.mean_return)
+        if period_return < 0:
+            self.downside_squares += period_return * period_return
+
+        self.mean_equity += (equity - self.mean_equity) / n
+
+        if equity >= self.peak:
+            self.peak = equity
+            self.drawdown_duration = 0
+        else:
+            self.drawdown_duration += 1
+            if self.drawdown_duration > self.max_drawdown_duration:
+                self.max_drawdown_duration = self.drawdown_duration
+            if self.peak > 0:
+                drawdown = (self.peak - equity) / self.peak
+                if drawdown > self.max_drawdown:
+                    self.max_drawdown = drawdown
+
+        if gross_value:
+            self.exposed_periods += 1
+            if equity > 0:
+                self.gross_exposure += gross_value / equity
+
+    def update_fill(self, traded_value: float, realized_pnl: float = 0.0):
+        """Updates the statistics with a fill. Called by Portfolio.update_fill.
+
+        Args:
+            traded_value (float): The absolute value traded by the fill.
+            realized_pnl (float, optional): The profit realized by the fill. Defaults to 0.0.
+        """
+        self.traded_value += traded_value
+        if realized_pnl > 0:
+            self.wins += 1
+            self.gross_profit += realized_pnl
+            self.largest_win = max(self.largest_win, realized_pnl)
+        elif realized_pnl < 0:
+            self.losses += 1
+            self.gross_loss -= realized_pnl
+            self.largest_loss = max(self.largest_loss, -realized_pnl)
+
+    def update_fills(self, traded_values: np.ndarray, realized_pnl: np.ndarray):
+        """Updates the statistics with a batch of fills. Called by Portfolio.update_fills.
+
+        Args:
+            traded_values (np.ndarray): The absolute value traded by each fill.
+            realized_pnl (np.ndarray): The profit realized by each fill.
+        """
+        self.traded_value += float(np.sum(traded_values))
+
+        wins = realized_pnl[realized_pnl > 0]
+        losses = realized_pnl[realized_pnl < 0]
+        if len(wins):
+            self.wins += len(wins)
+            self.gross_profit += float(np.sum(wins))
+            self.largest_win = max(self.largest_win, float(np.max(wins)))
+        if len(losses):
+            self.losses += len(losses)
+            self.gross_loss -= float(np.sum(losses))
+            self.largest_loss = max(self.largest_loss, -float(np.min(losses)))
+
+    @property
+    def total_return(self) -> float:
+        """The return of the portfolio since the first period."""
+        return self.equity / self.initial_equity - 1 if self.initial_equity else 0.0
+
+    @property
+    def volatility(self) -> float:
+        """The annualized standard deviation of the period returns."""
+        if self.periods < 2:
+            return 0.0
+        return math.sqrt(self.squared_deviations / (self.periods - 1) * self.periods_per_year)
+
+    @property
+    def sharpe_ratio(self) -> float:
+        """The annualized mean over standard deviation of the period returns, with no risk free rate."""
+        if self.periods < 2 or self.squared_deviations <= 0:
+            return 0.0
+        return self.mean_return / math.sqrt(self.squared_deviations / (self.periods - 1)) * math.sqrt(self.periods_per_year)
+
+    @property
+    def sortino_ratio(self) -> float:
+        """The annualized mean over downside deviation of the period returns."""
+        if not self.periods or self.downside_squares <= 0:
+            return 0.0
+        return self.mean_return / math.sqrt(self.downside_squares / self.periods) * math.sqrt(self.periods_per_year)
+
+    @property
+    def exposure(self) -> float:
+        """The fraction of periods ended with open positions."""
+        return self.exposed_periods / self.periods if self.periods else 0.0
+
+    @property
+    def average_gross_exposure(self) -> float:
+        """The mean absolute market value of the open positions as a fraction of the equity, over every period."""
+        return self.gross_exposure / self.periods if self.periods else 0.0
+
+    @property
+    def turnover(self) -> float:
+        """The total value traded as a multiple of the mean equity."""
+        return self.traded_value / self.mean_equity if self.mean_equity else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        """The fraction of fills realizing a profit among the fills realizing a profit or loss."""
+        trades = self.wins + self.losses
+        return self.wins / trades if trades else 0.0
+
+    @property
+    def profit_factor(self) -> float:
+        """The gross profit over the gross loss."""
+        if not self.gross_loss:
+            return float('inf') if self.gross_profit else 0.0
+        return self.gross_profit / self.gross_loss
+
+    def summary(self) -> dict:
+        """Exports the statistics as a flat dictionary of numbers, one record per run.
+
+        Returns:
+            dict: The current value of every statistic.
+        """
+        return {
+            'periods': self.periods,
+            'final_equity': self.equity,
+            'total_return': self.total_return,
+            'volatility': self.volatility,
+            'sharpe_ratio': self.sharpe_ratio,
+            'sortino_ratio': self.sortino_ratio,
+            'max_drawdown': self.max_drawdown,
+            'max_drawdown_duration': self.max_drawdown_duration,
+            'exposure': self.exposure,
+            'average_gross_exposure': self.average_gross_exposure,
+            'turnover': self.turnover,
+            'closed_trades': self.wins + self.losses,
+            'win_rate': self.win_rate,
+            'profit_factor': self.profit_factor,
+            'average_win': self.gross_profit / self.wins if self.wins else 0.0,
+            'average_loss': self.gross_loss / self.losses if self.losses else 0.0,
+            'largest_win': self.largest_win,
+            'largest_loss': self.largest_loss
+        }
+
+    def print_report(self):
+        """Prints every statistic to the console.
+        """
+        for name, value in self.summary().items():
+            label = name.replace('_', ' ').capitalize()
+            if isinstance(value, int):
+                print(f"{label:<32}{value:>16}")
+            else:
+                print(f"{label:<32}{value:>16.4f}")
@@ -0,0 +1,57 @@
+"""File containing the instrumentation used to time each stage of a backtest."""
+import time
+
+class StageTimer(object):
+    """A StageTimer accumulates the wall time and number of calls of each stage of the backtest, such as
+    the data handler update or the portfolio fill handling. Stages are timed by wrapping the functions
+    called by the event loop, so an uninstrumented run pays nothing.
+
+    Attributes:
+        stages (dict): A dictionary mapping each stage name to a list of [calls, seconds].
+        total_time (float): The wall time of the whole run in seconds.
+    """
+    def __init__(self):
+        """Constructor method
+        """
+        self.stages = {}
+        self.total_time = 0.0
+
+    def wrap(self, name: str, function):
+        """Wraps a function so each of its calls is timed as part of the given stage.
+
+        Args:
+            name (str): The name of the stage.
+            function (Callable): The function to time.
+
+        Returns:
+            Callable: The wrapped function, taking the same arguments.
+        """
+        stats = self.stages.setdefault(name, [0, 0.0])
+        perf_counter = time.perf_counter
+
+        def timed(*args):
+            start = perf_counter()
+            result = function(*args)
+            stats[1] += perf_counter() - start
+            stats[0] += 1
+            return result
+
+        return timed
+
+    def print_report(self, events: int = 0):
+        """Prints the wall time, call count and throughput of each stage to the console.
+
+        Args:
+            events (int, optional): The total number of events processed by the run. Defaults to 0.
+        """
+        print(f"{'Stage':<32}{'Calls':>12}{'Time (s)':>12}{'% Time':>9}{'Calls/s':>14}")
+        for name, (calls, seconds) in sorted(self.stages.items(), key=lambda item: -item[1][1]):
+            share = 100 * seconds / self.total_time if self.total_time else 0
+            if not calls:
+                rate = 0
+            else:
+                rate = calls / seconds if seconds else float('inf')
+            print(f"{name:<32}{calls:>12}{seconds:>12.4f}{share:>8.1f}%{rate:>14.0f}")
+
+        rate = events / self.total_time if self.total_time else 0
+        print(f"Total: {self.total_time:.4f}s, {events} events, {rate:.0f} events/s")
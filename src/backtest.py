@@ -1,14 +1,33 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+from analysis.timing import StageTimer
+from events.events import EventType, MarketEvent
+from events.pool import EventPool
 from generators.portfolio import Portfolio
 from generators.strategy import Strategy
 from generators.event_queue import EventQueue
-from handlers.datahandler import DataHandler
+from generators.order_generator import NaiveOrderGenerator, OrderGenerator
 from handlers.executionhandler import ExecutionHandler
 
+if TYPE_CHECKING:
+    from checkpoint import Checkpointer
+    from handlers.datahandler import DataHandler, FeedDataHandler
+
 class BackTest(object):
-    """_summary_
+    """A BackTest wires a Strategy, Portfolio and ExecutionHandler to a DataHandler through a single
+    EventQueue, and runs the event loop replaying the data.
 
-    Args:
-        object (_type_): _description_
+    Attributes:
+        event_queue (EventQueue): The queue shared by every component of the backtest.
+        periods (int): The number of trading periods replayed so far.
+        events (int): The number of events dispatched so far.
+        signals (int): The number of SignalEvents dispatched so far.
+        orders (int): The number of OrderEvents dispatched so far.
+        fills (int): The number of FillEvents dispatched so far.
+        timer (StageTimer): The timings of the last instrumented run, None if not instrumented.
     """
     def __init__(self,
                  symbols_list: list[str],
@@ -20,9 +39,28 @@ class BackTest(object):
                  start_date: str = '2000-01-01',
                  max_trading_periods: int = float('inf'),
                  portfolio: Portfolio = None,
-                 execution_handler: ExecutionHandler = None
+                 execution_handler: ExecutionHandler = None,
+                 event_pool: EventPool = None,
+                 event_queue: EventQueue = None,
+                 order_generator: OrderGenerator = None
                  ):
         """Constructor method
+
+        Args:
+            symbols_list (list[str]): The symbols traded by the backtest.
+            strategy (Strategy): The strategy generating the signals.
+            data_handler (DataHandler): The data handler replaying the bars.
+            initial_capital (float, optional): The starting cash balance. Defaults to 100000.0.
+            commission (float, optional): The commission as a fraction of the traded value. Defaults to 0.
+            fill_cost (float, optional): The flat fee paid per contract traded. Defaults to 0.87.
+            start_date (str, optional): The date the backtest starts at. Defaults to '2000-01-01'.
+            max_trading_periods (int, optional): The maximum number of periods to replay. Defaults to float('inf').
+            portfolio (Portfolio, optional): The portfolio to use instead of a default one. Defaults to None.
+            execution_handler (ExecutionHandler, optional): The execution handler to use instead of a default one. Defaults to None.
+            event_pool (EventPool, optional): A pool to reuse MarketEvents and FillEvents from, which requires
+                that no component keeps references to those events. Defaults to None.
+            event_queue (EventQueue, optional): The queue to use instead of a FIFO EventQueue, such as a PriorityEventQueue. Defaults to None.
+            order_generator (OrderGenerator, optional): The order generator of the default portfolio. Defaults to None, a NaiveOrderGenerator.
         """
         self.symbols_list = symbols_list
         self.strategy = strategy
@@ -33,9 +71,9 @@ class BackTest(object):
         self.max_trading_periods = max_trading_periods
         self.data_handler = data_handler
 
-        self.event_queue = EventQueue()
+        self.event_queue = event_queue if event_queue is not None else EventQueue()
         
-        self.portfolio = Portfolio(self.data_handler, self.event_queue, initial_capital)
+        self.portfolio = Portfolio(self.data_handler, self.event_queue, order_generator or NaiveOrderGenerator(), initial_capital)
         self.execution_handler = ExecutionHandler(self.event_queue, commission, fill_cost)
 
         if portfolio:
@@ -43,9 +81,171 @@ class BackTest(object):
 
         if execution_handler:
             self.execution_handler = execution_handler
-        
-    def run_backtest():
-        pass
 
-    def print_results():
-        pass
\ No newline at end of file
+        # Every component must share the backtest's queue
+        self.strategy.event_queue = self.event_queue
+        self.portfolio.event_queue = self.event_queue
+        self.execution_handler.event_queue = self.event_queue
+
+        self.event_pool = event_pool
+        if event_pool:
+            self.data_handler.event_pool = event_pool
+            self.execution_handler.event_pool = event_pool
+
+        self.periods = 0
+        self.events = 0
+        self.signals = 0
+        self.orders = 0
+        self.fills = 0
+        self.timer = None
+
+    def __getstate__(self) -> dict:
+        # The timings of a run are not part of a checkpoint
+        state = self.__dict__.copy()
+        state['timer'] = None
+        return state
+
+    @classmethod
+    def resume(cls, path: str, data_handler: FeedDataHandler) -> BackTest:
+        """Restores a backtest saved by a Checkpointer. Continuing it with run_backtest gives the same
+        results as a run which was never interrupted.
+
+        Args:
+            path (str): The path of the checkpoint.
+            data_handler (FeedDataHandler): A freshly built data handler over the same bars as the saved one.
+
+        Returns:
+            BackTest: The backtest, ready to continue from the bar after the saved one.
+        """
+        from checkpoint import load_checkpoint
+
+        return load_checkpoint(path, data_handler)
+
+    def _handlers(self, timer: StageTimer = None) -> tuple:
+        """Binds the handlers called by the event loop, each timed by a StageTimer if one is given.
+
+        Args:
+            timer (StageTimer, optional): The timer to wrap the handlers with. Defaults to None.
+
+        Returns:
+            tuple: The bound handlers, in the order _process_bar unpacks them.
+        """
+        handlers = (
+            ('Portfolio.update', self.portfolio.update),
+            ('Strategy.update', self.strategy.update),
+            ('ExecutionHandler.update', self.execution_handler.update),
+            ('Portfolio.update_signal', self.portfolio.update_signal),
+            ('Portfolio.update_signals', self.portfolio.update_signals),
+            ('ExecutionHandler.execute_order', self.execution_handler.execute_order),
+            ('Portfolio.update_fill', self.portfolio.update_fill),
+            ('Portfolio.update_fills', self.portfolio.update_fills)
+        )
+        if timer:
+            return tuple(timer.wrap(name, handler) for name, handler in handlers)
+        return tuple(handler for _, handler in handlers)
+
+    def _process_bar(self, market_event: MarketEvent, handlers: tuple):
+        """Dispatches every event caused by a new bar, in the batches handed back by the queue, then records
+        the period. Fills of a batch are applied together, then the signals of the batch are turned into
+        orders together, before the other events.
+
+        Args:
+            market_event (MarketEvent): The MarketEvent of the new bar, released by the caller afterwards.
+            handlers (tuple): The handlers bound by _handlers.
+        """
+        (update_portfolio, update_strategy, update_execution, update_signal, update_signals,
+         execute_order, update_fill, update_fills) = handlers
+        event_queue = self.event_queue
+        release = self.event_pool.release if self.event_pool else None
+
+        self.periods += 1
+        event_queue.put(market_event)
+
+        while True:
+            batch = event_queue.drain_batch(market_event.timestamp)
+            if not batch:
+                break
+
+            self.events += len(batch)
+            fills = [event for event in batch if event.type == EventType.FILL]
+            if fills:
+                self.fills += len(fills)
+                if len(fills) == 1:
+                    update_fill(fills[0])
+                else:
+                    update_fills(fills)
+                if release:
+                    for event in fills:
+                        release(event)
+
+            signals = [event for event in batch if event.type == EventType.SIGNAL]
+            if signals:
+                self.signals += len(signals)
+                if len(signals) == 1:
+                    update_signal(signals[0])
+                else:
+                    update_signals(signals)
+
+            for event in batch:
+                if event.type == EventType.MARKET:
+                    update_execution(event)
+                    update_portfolio(event)
+                    update_strategy()
+                elif event.type == EventType.ORDER:
+                    self.orders += 1
+                    execute_order(event)
+
+        self.portfolio.record(market_event.timestamp)
+
+    def run_backtest(self, instrument: bool = False, checkpointer: Checkpointer = None):
+        """Runs the event loop until the data handler is out of data or max_trading_periods is reached.
+        Each new bar is followed by dispatching every event it causes, in the batches handed back by the
+        queue: MarketEvents to the execution handler, portfolio and strategy, SignalEvents to the portfolio, OrderEvents to
+        the execution handler and FillEvents back to the portfolio. With a PriorityEventQueue, events
+        scheduled after the bar stay queued until a later bar reaches their timestamp.
+
+        Args:
+            instrument (bool, optional): Whether to time each handler, the results being kept in timer. Defaults to False.
+            checkpointer (Checkpointer, optional): Saves the backtest every checkpointer.every periods, so it
+                can be resumed with BackTest.resume. Defaults to None.
+        """
+        update_data = self.data_handler.update
+
+        self.timer = StageTimer() if instrument else None
+        if self.timer:
+            update_data = self.timer.wrap('DataHandler.update', update_data)
+        handlers = self._handlers(self.timer)
+
+        process_bar = self._process_bar
+        release = self.event_pool.release if self.event_pool else None
+        start = time.perf_counter()
+
+        while self.data_handler.continue_backtest and self.periods < self.max_trading_periods:
+            market_event = update_data()
+            if not self.data_handler.continue_backtest:
+                break
+
+            if market_event is None:
+                market_event = MarketEvent()
+            process_bar(market_event, handlers)
+            if release:
+                release(market_event)
+
+            if checkpointer and self.periods % checkpointer.every == 0:
+                checkpointer.save(self)
+
+        if checkpointer:
+            checkpointer.wait()
+        if self.timer:
+            self.timer.total_time = time.perf_counter() - start
+
+    def print_results(self):
+        """Prints a summary of the backtest to the console, including the final portfolio, its performance
+        statistics, the number of events of each type and, for an instrumented run, the time spent in each handler.
+        """
+        self.portfolio.print_status()
+        self.portfolio.statistics.print_report()
+        print(f'Periods={self.periods}, Events={self.events}, Signals={self.signals}, Orders={self.orders}, Fills={self.fills}')
+
+        if self.timer:
+            self.timer.print_report(self.events)
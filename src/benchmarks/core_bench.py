@@ -0,0 +1,250 @@
+"""Benchmark of the event-driven core replaying synthetic bars through the full backtest loop.
+
+Each case runs a reference strategy over synthetic OHLCV bars held by an ArrayDataHandler, through the
+MARKET, SIGNAL, ORDER and FILL cycle, in a fresh process so its peak RSS is its own. Results are saved
+as JSON and can be compared with the results of another commit. Run from the src directory with:
+
+    python -m benchmarks.core_bench --output before.json
+    python -m benchmarks.core_bench --output after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from backtest import BackTest
+from events.events import SignalEvent
+from events.pool import EventPool
+from generators.event_queue import EventQueue, PriorityEventQueue
+from generators.strategy import Strategy
+from handlers.bars import Columns
+from handlers.datahandler import ArrayDataHandler, DataHandler
+from handlers.indicators import SMA
+
+def synthetic_bars(symbols: int, bars: int, seed: int = 0) -> dict[str, Columns]:
+    """Generates minutely OHLCV bars following a geometric random walk.
+
+    Args:
+        symbols (int): The number of symbols.
+        bars (int): The number of bars per symbol.
+        seed (int, optional): The seed of the random generator. Defaults to 0.
+
+    Returns:
+        dict[str, Columns]: A dictionary mapping each symbol to its column arrays.
+    """
+    rng = np.random.default_rng(seed)
+    times = np.datetime64('2020-01-01T00:00', 'us') + np.arange(bars) * np.timedelta64(60, 's')
+
+    data = {}
+    for i in range(symbols):
+        close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.001, bars)))
+        open_price = np.r_[close[0], close[:-1]]
+        spread = np.abs(rng.normal(0, 0.0005, bars)) * close
+        data[f'SYM{i}'] = {
+            'datetime': times.copy(),
+            'open': open_price,
+            'high': np.maximum(open_price, close) + spread,
+            'low': np.minimum(open_price, close) - spread,
+            'close': close,
+            'adj_close': close.copy(),
+            'volume': rng.integers(100, 10000, bars)
+        }
+    return data
+
+class AlwaysTrade(Strategy):
+    """A reference strategy sending a signal for every symbol on every bar, alternating directions, so
+    every bar runs the full event cycle for every symbol.
+    """
+    def __init__(self, data_handler: DataHandler, event_queue: EventQueue):
+        super().__init__(data_handler, event_queue)
+        self.direction = True
+
+    def update(self):
+        self.direction = not self.direction
+        timestamp = self.data_handler.current_time
+        for symbol in self.data_handler.symbols:
+            self.event_queue.put(SignalEvent(symbol, timestamp, self.direction))
+
+class IndicatorCross(Strategy):
+    """A reference strategy trading the crosses of two moving averages, read from incremental indicators.
+    """
+    def __init__(self, data_handler: DataHandler, event_queue: EventQueue, short: int = 10, long: int = 50):
+        super().__init__(data_handler, event_queue)
+        self.above = {}
+        for symbol in data_handler.symbols:
+            data_handler.add_indicator(symbol, 'short', SMA(short))
+            data_handler.add_indicator(symbol, 'long', SMA(long))
+
+    def update(self):
+        get_indicator = self.data_handler.get_indicator
+        for symbol in self.data_handler.updated_symbols:
+            long = get_indicator(symbol, 'long')
+            if long is None:
+                continue
+            above = get_indicator(symbol, 'short') > long
+            if above != self.above.setdefault(symbol, above):
+                self.above[symbol] = above
+                self.event_queue.put(SignalEvent(symbol, self.data_handler.current_time, above))
+
+class WindowMomentum(Strategy):
+    """A reference strategy reading a trailing window of closes on every bar, and trading when the sign of
+    the return over the window changes.
+    """
+    def __init__(self, data_handler: DataHandler, event_queue: EventQueue, window: int = 50):
+        super().__init__(data_handler, event_queue)
+        self.window = window
+        self.rising = {}
+
+    def update(self):
+        for symbol in self.data_handler.updated_symbols:
+            closes = self.data_handler.get_latest_bar_values(symbol, 'close', self.window)
+            if len(closes) < self.window:
+                continue
+            rising = closes[-1] > closes.mean()
+            if rising != self.rising.setdefault(symbol, rising):
+                self.rising[symbol] = rising
+                self.event_queue.put(SignalEvent(symbol, self.data_handler.current_time, rising))
+
+# Case name: (strategy class, queue class, whether events are pooled)
+CASES = {
+    'always_trade': (AlwaysTrade, EventQueue, False),
+    'always_trade_pooled': (AlwaysTrade, EventQueue, True),
+    'always_trade_priority': (AlwaysTrade, PriorityEventQueue, False),
+    'indicator_cross': (IndicatorCross, EventQueue, False),
+    'window_momentum': (WindowMomentum, EventQueue, False),
+}
+
+def run_case(name: str, symbols: int, bars: int, repeat: int) -> dict:
+    """Runs a case, keeping the fastest of its repetitions.
+
+    Args:
+        name (str): The name of the case, a key of CASES.
+        symbols (int): The number of symbols.
+        bars (int): The number of bars per symbol.
+        repeat (int): The number of repetitions.
+
+    Returns:
+        dict: The measurements of the case.
+    """
+    strategy_class, queue_class, pooled = CASES[name]
+    data = synthetic_bars(symbols, bars)
+
+    best = None
+    for _ in range(repeat):
+        data_handler = ArrayDataHandler(data)
+        event_queue = queue_class()
+        pool = EventPool() if pooled else None
+        backtest = BackTest(list(data), strategy_class(data_handler, event_queue), data_handler,
+                            event_pool=pool, event_queue=event_queue)
+
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        backtest.run_backtest()
+        elapsed = time.perf_counter() - start
+        blocks = sys.getallocatedblocks() - blocks
+
+        if best is None or elapsed < best[0]:
+            # Counted, not measured: without a pool every event is created, with one only signals and orders always are
+            created = pool.allocated + backtest.signals + backtest.orders if pool else backtest.events
+            best = (elapsed, backtest, created, blocks)
+
+    elapsed, backtest, created, blocks = best
+    total_bars = symbols * bars
+    return {
+        'seconds': elapsed,
+        'periods': backtest.periods,
+        'events': backtest.events,
+        'fills': backtest.fills,
+        'bars_per_second': total_bars / elapsed,
+        'events_per_second': backtest.events / elapsed,
+        'events_created_per_bar': created / total_bars,
+        'retained_blocks_per_bar': blocks / total_bars,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def peak_rss_mb() -> float:
+    """Returns the peak RSS of the process in MB. ru_maxrss is in bytes on macOS and in KB elsewhere."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Prints the change in throughput of each case against a baseline.
+
+    Args:
+        results (dict): The results of this run.
+        baseline (dict): The results of the baseline run.
+        threshold (float): The relative slowdown reported as a regression.
+
+    Returns:
+        list[str]: The cases slower than the baseline by more than the threshold.
+    """
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit')}:")
+    print(f"{'Case':<26}{'Bars/s':>14}{'Baseline':>14}{'Change':>10}")
+    for name, result in results['cases'].items():
+        base = baseline['cases'].get(name)
+        if base is None:
+            continue
+        change = result['bars_per_second'] / base['bars_per_second'] - 1
+        flag = ''
+        if change < -threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<26}{result['bars_per_second']:>14.0f}{base['bars_per_second']:>14.0f}{100 * change:>9.1f}%{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=4, help='number of symbols')
+    parser.add_argument('--bars', type=int, default=50_000, help='number of bars per symbol')
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions per case, the fastest is kept')
+    parser.add_argument('--cases', nargs='*', choices=list(CASES), default=list(CASES), help='cases to run')
+    parser.add_argument('--output', help='path of the JSON file to save the results to')
+    parser.add_argument('--compare', help='path of a JSON file of results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'symbols': args.symbols,
+        'bars': args.bars,
+        'cases': {}
+    }
+
+    print(f"{'Case':<26}{'Bars/s':>14}{'Events/s':>14}{'Events made/bar':>17}{'Blocks/bar':>12}{'Peak RSS (MB)':>15}")
+    for name in args.cases:
+        # A fresh process per case, so the peak RSS is not inherited from the previous case
+        with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as executor:
+            result = executor.submit(run_case, name, args.symbols, args.bars, args.repeat).result()
+        results['cases'][name] = result
+        print(f"{name:<26}{result['bars_per_second']:>14.0f}{result['events_per_second']:>14.0f}"
+              f"{result['events_created_per_bar']:>17.3f}{result['retained_blocks_per_bar']:>12.3f}{result['peak_rss_mb']:>15.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
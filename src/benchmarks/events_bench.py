@@ -0,0 +1,100 @@
+"""Benchmark of the memory and time spent allocating events in the hot loop.
+
+Compares the previous dictionary based events, the slotted events and the slotted events taken from an
+EventPool. Run from the src directory with:
+
+    python -m benchmarks.events_bench
+"""
+import argparse
+import time
+import tracemalloc
+
+from events.events import EventType, FillEvent, MarketEvent
+from events.pool import EventPool
+
+class DictMarketEvent(object):
+    """The MarketEvent layout before slotted events, with an instance dictionary and a string tag."""
+    def __init__(self, timestamp=None, symbols=None):
+        self.type = 'MARKET'
+        self.timestamp = timestamp
+        self.symbols = symbols
+
+class DictFillEvent(object):
+    """The FillEvent layout before slotted events, with an instance dictionary and a string tag."""
+    def __init__(self, symbol, timestamp, quantity, direction, fill_cost=0, commission=0):
+        self.type = 'FILL'
+        self.symbol = symbol
+        self.timestamp = timestamp
+        self.quantity = quantity
+        self.direction = direction
+        self.fill_cost = fill_cost
+        self.commission = commission
+
+def bytes_per_event(make_event, number: int) -> float:
+    """Measures the memory held by live events.
+
+    Args:
+        make_event (Callable): Creates one event from an index.
+        number (int): The number of events to keep alive.
+
+    Returns:
+        float: The traced memory per event in bytes.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    events = [make_event(i) for i in range(number)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del events
+    return (after - before) / number
+
+def churn(make_event, release, tag, number: int) -> float:
+    """Measures the time to create, dispatch and discard events one at a time, as the event loop does.
+
+    Args:
+        make_event (Callable): Creates one event from an index.
+        release (Callable): Called with each event once dispatched, None to drop it.
+        tag: The type tag dispatch compares against.
+        number (int): The number of events to process.
+
+    Returns:
+        float: The time per event in nanoseconds.
+    """
+    start = time.perf_counter()
+    for i in range(number):
+        event = make_event(i)
+        if event.type == tag and release:
+            release(event)
+    return (time.perf_counter() - start) / number * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1_000_000, help='number of events per measurement')
+    args = parser.parse_args()
+    number = args.events
+
+    pool = EventPool()
+
+    cases = [
+        ('MarketEvent (dict)', lambda i: DictMarketEvent(i, None), None, 'MARKET'),
+        ('MarketEvent (slots)', lambda i: MarketEvent(i, None), None, EventType.MARKET),
+        ('MarketEvent (pool)', lambda i: pool.market_event(i, None), pool.release, EventType.MARKET),
+        ('FillEvent (dict)', lambda i: DictFillEvent('MNQ', i, 1, 'BUY', 0.87, 0), None, 'FILL'),
+        ('FillEvent (slots)', lambda i: FillEvent('MNQ', i, 1, 'BUY', 0.87, 0), None, EventType.FILL),
+        ('FillEvent (pool)', lambda i: pool.fill_event('MNQ', i, 1, 'BUY', 0.87, 0), pool.release, EventType.FILL),
+    ]
+
+    print(f"{'Case':<24}{'Bytes/event':>14}{'ns/event':>12}{'Allocs/event':>15}")
+    for name, make_event, release, tag in cases:
+        size = bytes_per_event(make_event, min(number, 100_000))
+
+        allocated = pool.allocated
+        elapsed = churn(make_event, release, tag, number)
+        # Without a pool every event is a new allocation
+        allocations = (pool.allocated - allocated) / number if release else 1.0
+
+        print(f"{name:<24}{size:>14.1f}{elapsed:>12.1f}{allocations:>15.6f}")
+
+if __name__ == '__main__':
+    main()
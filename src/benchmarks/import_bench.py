@@ -0,0 +1,144 @@
+"""Benchmark of the time and memory spent importing the modules of the engine.
+
+Each module is imported in a fresh interpreter, so its measurements include every module it pulls in.
+The core modules must import without any of the optional backends, which are only loaded by the data
+handlers using them. Run from the src directory with:
+
+    python -m benchmarks.import_bench --output before.json
+    python -m benchmarks.import_bench --output after.json --compare before.json
+
+Exits with status 1 if a module loads an optional backend, or imports slower than the baseline by more
+than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+# Modules a worker replaying arrays in memory imports, which must not load any optional backend
+CORE_MODULES = (
+    'events.events',
+    'events.pool',
+    'generators.event_queue',
+    'generators.portfolio',
+    'generators.strategy',
+    'handlers.executionhandler',
+    'handlers.datahandler',
+    'backtest',
+    'sweep'
+)
+
+# Backends only loaded by the data handlers using them
+OPTIONAL_BACKENDS = ('mysql', 'pandas', 'pyarrow', 'yfinance')
+
+# Run by each child interpreter, printing the measurements of one import as JSON
+_CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = sorted({{name.split('.')[0] for name in sys.modules}} & set({backends!r}))
+try:
+    # The peak RSS of a child can be inherited from its parent, so the current RSS is read where available
+    with open('/proc/self/statm') as file:
+        rss = int(file.read().split()[1]) * resource.getpagesize() / 2 ** 20
+except OSError:
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == 'darwin' else 1024)
+print(json.dumps({{'seconds': elapsed, 'modules': len(sys.modules), 'rss_mb': rss, 'backends': loaded}}))
+"""
+
+def measure(module: str, repeat: int) -> dict:
+    """Imports a module in fresh interpreters, keeping the median time.
+
+    Args:
+        module (str): The module to import.
+        repeat (int): The number of interpreters to start.
+
+    Returns:
+        dict: The measurements of the module.
+    """
+    code = _CHILD.format(module=module, backends=OPTIONAL_BACKENDS)
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+        runs.append(json.loads(output))
+
+    return {
+        'seconds': statistics.median(run['seconds'] for run in runs),
+        'modules': runs[0]['modules'],
+        'rss_mb': statistics.median(run['rss_mb'] for run in runs),
+        'backends': runs[0]['backends']
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Prints the change in import time of each module against a baseline.
+
+    Args:
+        results (dict): The results of this run.
+        baseline (dict): The results of the baseline run.
+        threshold (float): The relative slowdown reported as a regression.
+
+    Returns:
+        list[str]: The modules slower than the baseline by more than the threshold.
+    """
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit')}:")
+    print(f"{'Module':<28}{'Time (ms)':>12}{'Baseline':>12}{'Change':>10}")
+    for module, result in results['modules'].items():
+        base = baseline['modules'].get(module)
+        if base is None:
+            continue
+        change = result['seconds'] / base['seconds'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(module)
+            flag = '  REGRESSION'
+        print(f"{module:<28}{1000 * result['seconds']:>12.1f}{1000 * base['seconds']:>12.1f}{100 * change:>9.1f}%{flag}")
+    return regressions
+
+def main():
+    from benchmarks.core_bench import git_commit
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modules', nargs='*', default=list(CORE_MODULES), help='modules to import')
+    parser.add_argument('--repeat', type=int, default=5, help='interpreters started per module, the median is kept')
+    parser.add_argument('--output', help='path of the JSON file to save the results to')
+    parser.add_argument('--compare', help='path of a JSON file of results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.25, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'modules': {}
+    }
+
+    failed = False
+    print(f"{'Module':<28}{'Time (ms)':>12}{'Modules':>10}{'RSS (MB)':>10}  Backends")
+    for module in args.modules:
+        result = measure(module, args.repeat)
+        results['modules'][module] = result
+        print(f"{module:<28}{1000 * result['seconds']:>12.1f}{result['modules']:>10}{result['rss_mb']:>10.1f}  {', '.join(result['backends']) or '-'}")
+        if result['backends']:
+            failed = True
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            if compare(results, json.load(file), args.threshold):
+                failed = True
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""File containing the checkpoints saving and restoring the full state of a running backtest."""
+import io
+import os
+import pickle
+import threading
+
+from handlers.datahandler import FeedDataHandler
+
+CHECKPOINT_VERSION = 1
+
+class _CheckpointPickler(pickle.Pickler):
+    """Pickles a backtest, saving every reference to its data handler as a placeholder, so the bars are not
+    part of the checkpoint and the data handler can be rebuilt by the caller on resume.
+    """
+    def __init__(self, file, data_handler: FeedDataHandler):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.data_handler = data_handler
+
+    def persistent_id(self, obj):
+        if obj is self.data_handler:
+            return 'data_handler'
+        return None
+
+class _CheckpointUnpickler(pickle.Unpickler):
+    """Unpickles a backtest, replacing the data handler placeholder with the data handler given.
+    """
+    def __init__(self, file, data_handler: FeedDataHandler):
+        super().__init__(file)
+        self.data_handler = data_handler
+
+    def persistent_load(self, pid):
+        if pid == 'data_handler':
+            return self.data_handler
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid}.")
+
+def snapshot(backtest) -> bytes:
+    """Serializes the state of a backtest between two bars: the replay position and indicators of its data
+    handler, and its strategy, portfolio, execution handler, event queue and event pool, pickled in one
+    pass so objects shared between them stay shared.
+
+    Args:
+        backtest (BackTest): The backtest to save, whose data handler must be a FeedDataHandler.
+
+    Returns:
+        bytes: The checkpoint.
+    """
+    buffer = io.BytesIO()
+    _CheckpointPickler(buffer, backtest.data_handler).dump({
+        'version': CHECKPOINT_VERSION,
+        'data_handler': backtest.data_handler.get_state(),
+        'backtest': backtest
+    })
+    return buffer.getvalue()
+
+def restore(checkpoint: bytes, data_handler: FeedDataHandler):
+    """Rebuilds a backtest from a checkpoint.
+
+    Args:
+        checkpoint (bytes): The checkpoint, as returned by snapshot.
+        data_handler (FeedDataHandler): A freshly built data handler over the same bars as the saved one,
+            which is moved to the saved position and used by every restored component.
+
+    Returns:
+        BackTest: The backtest, ready to continue from the bar after the saved one.
+    """
+    state = _CheckpointUnpickler(io.BytesIO(checkpoint), data_handler).load()
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {state.get('version')}, expected {CHECKPOINT_VERSION}.")
+
+    data_handler.set_state(state['data_handler'])
+    backtest = state['backtest']
+    if backtest.event_pool:
+        data_handler.event_pool = backtest.event_pool
+    return backtest
+
+def load_checkpoint(path: str, data_handler: FeedDataHandler):
+    """Rebuilds a backtest from a checkpoint file.
+
+    Args:
+        path (str): The path of the checkpoint.
+        data_handler (FeedDataHandler): A freshly built data handler over the same bars as the saved one.
+
+    Returns:
+        BackTest: The backtest, ready to continue from the bar after the saved one.
+    """
+    with open(path, 'rb') as file:
+        return restore(file.read(), data_handler)
+
+class Checkpointer(object):
+    """A Checkpointer saves a backtest to a file every given number of periods. The loop is only paused to
+    take the snapshot in memory, while the file is written by a background thread. Each checkpoint is
+    written to a temporary file first and then renamed, so the file always holds a complete checkpoint.
+
+    Attributes:
+        path (str): The path of the checkpoint file.
+        every (int): The number of periods between two checkpoints.
+        saved (int): The number of checkpoints taken so far.
+    """
+    def __init__(self, path: str, every: int = 10000):
+        """Constructor method
+
+        Args:
+            path (str): The path of the checkpoint file, overwritten by each checkpoint.
+            every (int, optional): The number of periods between two checkpoints. Defaults to 10000.
+        """
+        if every < 1:
+            raise ValueError(f"Checkpoints must be at least one period apart, got {every}.")
+
+        self.path = path
+        self.every = every
+        self.saved = 0
+        self.writer = None
+        self.error = None
+
+    def save(self, backtest):
+        """Takes a checkpoint of a backtest and writes it in the background. Waits for the previous
+        checkpoint to be written first, so at most one checkpoint is held in memory.
+
+        Args:
+            backtest (BackTest): The backtest to save, between two bars.
+        """
+        self.wait()
+        checkpoint = snapshot(backtest)
+        self.writer = threading.Thread(target=self.__write, args=(checkpoint,), daemon=True)
+        self.writer.start()
+        self.saved += 1
+
+    def __write(self, checkpoint: bytes):
+        try:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'wb') as file:
+                file.write(checkpoint)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp, self.path)
+        except OSError as error:
+            self.error = error
+
+    def wait(self):
+        """Waits for the latest checkpoint to be written, raising the error of the write if it failed.
+        """
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
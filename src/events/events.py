@@ -1,33 +1,57 @@
 """File containing the Event classes for the trading system."""
 
 from abc import ABC
+from enum import IntEnum
+
+class EventType(IntEnum):
+    """The type tag of each event, used to dispatch events without comparing strings.
+    """
+    MARKET = 0
+    SIGNAL = 1
+    ORDER = 2
+    FILL = 3
 
 class Event(ABC):
-    """An abstract class serving as the base class for all other event types.
+    """An abstract class serving as the base class for all other event types. Events use __slots__ and a
+    class level type tag, so no instance dictionary is allocated for them.
     """
+    __slots__ = ()
 
 class MarketEvent(Event):
     """A MarketEvent object acts as a signal that market data has been updated, signalling
     to the rest of the program that new data is available for processing.
 
     Attributes:
-        type: A string representing the type of event. In this case, 'MARKET'.
+        type: An EventType representing the type of event. In this case, EventType.MARKET.
+        timestamp: The timestamp of the new data.
+        symbols: A list of the symbols with new data, None if unknown.
     """
-    def __init__(self):
-        """_summary_
+    __slots__ = ('timestamp', 'symbols')
+    type = EventType.MARKET
+
+    def __init__(self, timestamp=None, symbols: list[str] = None):
+        """Constructor method
+
+        Args:
+            timestamp (optional): The timestamp of the new data. Defaults to None.
+            symbols (list[str], optional): The symbols with new data. Defaults to None.
         """
-        self.type = 'MARKET'
+        self.timestamp = timestamp
+        self.symbols = symbols
 
 class SignalEvent(Event):
     """A signal event is generated by a strategy object and represents a trading signal created by our strategy.
 
     Attributes:
-        type: A string representing the type of event. In this case, 'SIGNAL'.
+        type: An EventType representing the type of event. In this case, EventType.SIGNAL.
         symbol: A string representing the symbol of the asset being traded.
         timestamp: A string representing the timestamp the signal was generated.
         direction: A boolean representing the direction of the signal. True for long, False for short.
         strength: A float representing the strength of the signal. Can be adjusted to user preference.
     """
+    __slots__ = ('symbol', 'timestamp', 'direction', 'strength')
+    type = EventType.SIGNAL
+
     def __init__(self, symbol: str, timestamp: str, direction: bool, strength: float = 0):
         """Constructor method
 
@@ -37,7 +61,6 @@ class SignalEvent(Event):
             direction (bool): The direction of the signal. True for long, False for short.
             strength (float): The strength of the signal (dependant on user preference). Defaults to 0. 
         """        
-        self.type = 'SIGNAL'
         self.symbol = symbol
         self.timestamp = timestamp
         self.direction = direction
@@ -48,46 +71,56 @@ class OrderEvent(Event):
     by our Portfolio as a result of a signal.
 
     Attributes:
-        type: A string representing the type of event. In this case, 'ORDER'.
+        type: An EventType representing the type of event. In this case, EventType.ORDER.
         symbol: A string representing the symbol of the asset being traded.
         timestamp: A string representing the timestamp the order was generated.
-        order_type: A string representing the type of order. Can be 'market' or 'limit'.
+        order_type: A string representing the type of order. Can be 'market', 'limit' or 'stop'.
         quantity: An integer representing the quantity of the asset being traded.
+        price: A float representing the limit or stop price of the order, None for a market order.
     """
-    def __init__(self, symbol: str, timestamp: str, order_type: str = 'market', quantity: int = 1):
+    __slots__ = ('symbol', 'timestamp', 'order_type', 'quantity', 'price')
+    type = EventType.ORDER
+
+    def __init__(self, symbol: str, timestamp: str, order_type: str = 'market', quantity: int = 1, price: float = None):
         """Constructor method
 
         Args:
             symbol (str): The symbol of the asset being traded.
             timestamp (str): The timestamp the order was generated.
-            order_type (str, optional): The type of order, examples being market or limit. Defaults to 'market'.
+            order_type (str, optional): The type of order, examples being market, limit or stop. Defaults to 'market'.
             quantity (int, optional): The quantity of the asset being traded. Defaults to 1.
+            price (float, optional): The limit or stop price of the order. Defaults to None.
         """
-        self.type = 'ORDER'
         self.symbol = symbol
         self.timestamp = timestamp
         self.order_type = order_type
         self.quantity = quantity
+        self.price = price
     
     def print_order(self):
         """Prints a summary of the order event to the console.
         """
-        print(f"Order: Symbol={self.symbol}, Timestamp={self.timestamp}, Type={self.order_type}, Quantity={self.quantity}")
+        print(f"Order: Symbol={self.symbol}, Timestamp={self.timestamp}, Type={self.order_type}, Quantity={self.quantity}, Price={self.price}")
 
 class FillEvent(Event):
     """A FillEvent object represents a filled order in the market. This event is generated by the ExecutionHandler
     from an order.
 
     Attributes:
-        type: A string representing the type of event. In this case, 'FILL'.
+        type: An EventType representing the type of event. In this case, EventType.FILL.
         symbol: A string representing the symbol of the asset being traded.
         timestamp: A string representing the timestamp the order was filled.
         quantity: An integer representing the quantity of the asset being traded.
         direction: A string representing the direction of the fill. Can be 'BUY' or 'SELL'.
         fill_cost: A float representing the cost of the fill. A flat fee added to the total price of the order.
         commission: A float representing the commission cost, a percentage of the total order.
+        price: A float representing the price the order was filled at, None to fill at the latest close.
     """
-    def __init__(self, symbol: str, timestamp: str, quantity: int, direction: str, fill_cost: float = 0, commission: float = 0):
+    __slots__ = ('symbol', 'timestamp', 'quantity', 'direction', 'fill_cost', 'commission', 'price')
+    type = EventType.FILL
+
+    def __init__(self, symbol: str, timestamp: str, quantity: int, direction: str, fill_cost: float = 0, commission: float = 0,
+                 price: float = None):
         """Constructor method
 
         Args:
@@ -97,11 +130,12 @@ class FillEvent(Event):
             direction (str): The direction of the fill. Can be 'BUY' or 'SELL'.
             fill_cost (float, optional): The cost of the fill, a flat fee added onto the cost of the trade. Defaults to 0.
             commission (float, optional): The commission of the order as a percent of the total order price. Defaults to 0.
+            price (float, optional): The price the order was filled at, None to fill at the latest close. Defaults to None.
         """
-        self.type = 'FILL'
         self.symbol = symbol
         self.timestamp = timestamp
         self.quantity = quantity
         self.direction = direction
         self.fill_cost = fill_cost
-        self.commission = commission
\ No newline at end of file
+        self.commission = commission
+        self.price = price
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""File containing the free-list pool used to reuse events in the event loop."""
+
+from events.events import Event, EventType, FillEvent, MarketEvent
+
+class EventPool(object):
+    """An EventPool keeps free lists of released MarketEvent and FillEvent objects, so the event loop can
+    reuse them instead of allocating new events on every bar. An event must not be used once released,
+    so the pool is only safe when no component keeps a reference to the events it handles.
+
+    Attributes:
+        max_size (int): The maximum number of free events kept for each type.
+        market_events (list[MarketEvent]): The free MarketEvents.
+        fill_events (list[FillEvent]): The free FillEvents.
+        allocated (int): The number of events the pool had to allocate because its free list was empty.
+    """
+    def __init__(self, max_size: int = 1024):
+        """Constructor method
+
+        Args:
+            max_size (int, optional): The maximum number of free events kept for each type. Defaults to 1024.
+        """
+        self.max_size = max_size
+        self.market_events = []
+        self.fill_events = []
+        self.allocated = 0
+
+    def market_event(self, timestamp=None, symbols: list[str] = None) -> MarketEvent:
+        """Returns a MarketEvent, reusing a free one if available.
+
+        Args:
+            timestamp (optional): The timestamp of the new data. Defaults to None.
+            symbols (list[str], optional): The symbols with new data. Defaults to None.
+
+        Returns:
+            MarketEvent: The initialized MarketEvent.
+        """
+        if not self.market_events:
+            self.allocated += 1
+            return MarketEvent(timestamp, symbols)
+
+        event = self.market_events.pop()
+        event.timestamp = timestamp
+        event.symbols = symbols
+        return event
+
+    def fill_event(self, symbol: str, timestamp: str, quantity: int, direction: str, fill_cost: float = 0, commission: float = 0,
+                   price: float = None) -> FillEvent:
+        """Returns a FillEvent, reusing a free one if available.
+
+        Args:
+            symbol (str): The symbol of the asset being traded.
+            timestamp (str): The timestamp the order was filled.
+            quantity (int): The quantity of the asset being traded.
+            direction (str): The direction of the fill. Can be 'BUY' or 'SELL'.
+            fill_cost (float, optional): The flat fee per unit traded. Defaults to 0.
+            commission (float, optional): The commission as a percent of the total order price. Defaults to 0.
+            price (float, optional): The price the order was filled at, None to fill at the latest close. Defaults to None.
+
+        Returns:
+            FillEvent: The initialized FillEvent.
+        """
+        if not self.fill_events:
+            self.allocated += 1
+            return FillEvent(symbol, timestamp, quantity, direction, fill_cost, commission, price)
+
+        event = self.fill_events.pop()
+        event.symbol = symbol
+        event.timestamp = timestamp
+        event.quantity = quantity
+        event.direction = direction
+        event.fill_cost = fill_cost
+        event.commission = commission
+        event.price = price
+        return event
+
+    def release(self, event: Event):
+        """Returns an event to the pool once it has been fully processed. Events of other types are ignored.
+
+        Args:
+            event (Event): The event to release.
+        """
+        if event.type == EventType.MARKET:
+            if len(self.market_events) < self.max_size:
+                event.symbols = None
+                self.market_events.append(event)
+        elif event.type == EventType.FILL:
+            if len(self.fill_events) < self.max_size:
+                self.fill_events.append(event)
@@ -0,0 +1,96 @@
+class ContractSpec(object):
+    """A ContractSpec describes how one contract of a symbol is valued and margined.
+
+    Attributes:
+        multiplier (float): The value of a one point move of one contract, in the currency of the contract.
+        margin (float): The margin required per contract held, in the currency of the contract.
+        currency (str): The currency the contract is priced in.
+    """
+    __slots__ = ('multiplier', 'margin', 'currency')
+
+    def __init__(self, multiplier: float = 1, margin: float = 0, currency: str = 'USD'):
+        """Constructor method
+
+        Args:
+            multiplier (float, optional): The value of a one point move of one contract. Defaults to 1.
+            margin (float, optional): The margin required per contract held, 0 for none. Defaults to 0.
+            currency (str, optional): The currency the contract is priced in. Defaults to 'USD'.
+        """
+        self.multiplier = multiplier
+        self.margin = margin
+        self.currency = currency
+
+class ContractTable(object):
+    """A ContractTable maps each symbol to its ContractSpec, and each currency to its exchange rate into the
+    base currency of the portfolio. Symbols without a spec use the default spec.
+
+    The PositionBook copies the spec of each symbol into its arrays when the symbol is first seen, so the
+    portfolio reads multipliers, margins and rates by symbol id instead of looking specs up on every fill.
+
+    Attributes:
+        specs (dict[str, ContractSpec]): A dictionary mapping each symbol to its spec.
+        default (ContractSpec): The spec of symbols without one.
+        base_currency (str): The currency the portfolio is accounted in.
+        rates (dict[str, float]): A dictionary mapping each currency to the value of one unit in the base currency.
+        currency_ids (dict[str, int]): A dictionary mapping each currency to an integer id.
+    """
+    def __init__(self, specs: dict[str, ContractSpec] = None, default: ContractSpec = None, base_currency: str = 'USD',
+                 rates: dict[str, float] = None):
+        """Constructor method
+
+        Args:
+            specs (dict[str, ContractSpec], optional): A dictionary mapping each symbol to its spec. Defaults to None.
+            default (ContractSpec, optional): The spec of symbols without one. Defaults to None, a ContractSpec().
+            base_currency (str, optional): The currency the portfolio is accounted in. Defaults to 'USD'.
+            rates (dict[str, float], optional): The value of one unit of each other currency in the base currency. Defaults to None.
+        """
+        self.specs = dict(specs) if specs else {}
+        self.default = default if default is not None else ContractSpec(currency=base_currency)
+        self.base_currency = base_currency
+        self.rates = {base_currency: 1.0}
+        self.currency_ids = {base_currency: 0}
+        for currency, rate in (rates or {}).items():
+            self.set_rate(currency, rate)
+
+    def get(self, symbol: str) -> ContractSpec:
+        return self.specs.get(symbol, self.default)
+
+    def currency_id(self, currency: str) -> int:
+        """Returns the id of a currency, adding it if needed.
+
+        Args:
+            currency (str): The currency to look up.
+
+        Returns:
+            int: The id of the currency.
+        """
+        index = self.currency_ids.get(currency)
+        if index is None:
+            index = self.currency_ids[currency] = len(self.currency_ids)
+        return index
+
+    def rate(self, currency: str) -> float:
+        """Returns the value of one unit of a currency in the base currency.
+
+        Args:
+            currency (str): The currency to convert from.
+
+        Returns:
+            float: The exchange rate.
+        """
+        try:
+            return self.rates[currency]
+        except KeyError:
+            raise ValueError(f"No exchange rate from {currency} to {self.base_currency}.") from None
+
+    def set_rate(self, currency: str, rate: float):
+        """Sets the value of one unit of a currency in the base currency.
+
+        Args:
+            currency (str): The currency to convert from.
+            rate (float): The exchange rate.
+        """
+        if currency == self.base_currency and rate != 1:
+            raise ValueError(f"The rate of the base currency {currency} must be 1.")
+        self.rates[currency] = rate
+        self.currency_id(currency)
@@ -1,4 +1,9 @@
+import heapq
 from collections import deque
+from itertools import count
+
+import numpy as np
+
 from events.events import Event
 
 class EventQueue(object):
@@ -33,12 +38,27 @@ class EventQueue(object):
         return self.queue.popleft()
 
     def put(self, event: Event):
-        """Adds a new element to the back of the Event queue
+        """Adds a new element to the back of the Event queue. None is ignored, so handlers can put
+        whatever they generate without checking it.
 
         Args:
             event (Event): The event being added to the queue.
         """
-        self.queue.append(event)
+        if event is not None:
+            self.queue.append(event)
+
+    def drain_batch(self, until=None) -> list[Event]:
+        """Pops every event currently in the queue at once.
+
+        Args:
+            until (optional): Unused, as events are not scheduled in time. Defaults to None.
+
+        Returns:
+            list[Event]: The events in the order they were added, empty if the queue is empty.
+        """
+        batch = list(self.queue)
+        self.queue.clear()
+        return batch
 
     def is_empty(self)->bool:
         """Check whether the queue is empty.
@@ -47,4 +67,102 @@ class EventQueue(object):
             bool: True if queue is empty, False otherwise
         """
         return len(self.queue) == 0
-    
\ No newline at end of file
+
+def timestamp_key(timestamp) -> int:
+    """Converts a timestamp to the integer number of microseconds used to order a PriorityEventQueue.
+
+    Args:
+        timestamp: A datetime, np.datetime64 or ISO formatted string.
+
+    Returns:
+        int: The microseconds since the epoch.
+    """
+    return int(np.datetime64(timestamp, 'us').astype(np.int64))
+
+class PriorityEventQueue(EventQueue):
+    """A PriorityEventQueue orders events by (timestamp, priority, sequence) in a heap instead of in
+    arrival order, so events such as delayed fills can be scheduled for a future timestamp. Events with
+    the same timestamp and priority keep their arrival order.
+
+    Attributes:
+        queue: A list holding the heap of (timestamp, priority, sequence, event) entries.
+        now (int): The timestamp of the latest batch drained, in microseconds, used for events put without one.
+    """
+    def __init__(self):
+        """Constructor method
+        """
+        self.queue = []
+        self.sequence = count()
+        self.now = -2 ** 63
+
+    def __getstate__(self) -> dict:
+        # Counters cannot be pickled on every Python version, so the next sequence number is saved instead
+        following = next(self.sequence)
+        self.sequence = count(following)
+        return {'queue': self.queue, 'sequence': following, 'now': self.now}
+
+    def __setstate__(self, state: dict):
+        self.queue = state['queue']
+        self.sequence = count(state['sequence'])
+        self.now = state['now']
+
+    def peek(self)->Event:
+        """Look at the earliest event in the queue without popping it.
+
+        Returns:
+            Event: Returns the earliest event in the queue, or None is the queue is empty.
+        """
+        if self.is_empty():
+            return None
+        return self.queue[0][3]
+
+    def get_next(self)->Event:
+        """Pops the earliest event from the queue and returns it.
+
+        Returns:
+            Event: Returns the earliest event in the queue, or None is the queue is empty.
+        """
+        if self.is_empty():
+            return None
+        return heapq.heappop(self.queue)[3]
+
+    def put(self, event: Event, timestamp=None, priority: int = 0):
+        """Schedules an event. None is ignored.
+
+        Args:
+            event (Event): The event being added to the queue.
+            timestamp (optional): The time the event is due at. Defaults to None, using the timestamp of
+                the event if it has one, or the time of the latest batch drained otherwise.
+            priority (int, optional): Orders events due at the same time, lowest first. Defaults to 0.
+        """
+        if event is None:
+            return
+
+        if timestamp is None:
+            timestamp = getattr(event, 'timestamp', None)
+        key = self.now if timestamp is None else timestamp_key(timestamp)
+
+        heapq.heappush(self.queue, (key, priority, next(self.sequence), event))
+
+    def drain_batch(self, until=None) -> list[Event]:
+        """Pops every event due at the earliest timestamp in the queue, or every event due up to a given time.
+
+        Args:
+            until (optional): The latest time to pop events for. Defaults to None, popping only the events
+                sharing the earliest timestamp.
+
+        Returns:
+            list[Event]: The events in (timestamp, priority, sequence) order, empty if none are due.
+        """
+        queue = self.queue
+        if not queue:
+            return []
+
+        limit = queue[0][0] if until is None else timestamp_key(until)
+        batch = []
+        while queue and queue[0][0] <= limit:
+            entry = heapq.heappop(queue)
+            self.now = max(self.now, entry[0])
+            batch.append(entry[3])
+
+        return batch
@@ -1,14 +1,135 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
 from events.events import OrderEvent, SignalEvent
 
+if TYPE_CHECKING:
+    from generators.portfolio import Portfolio
+
+def is_long(direction) -> bool:
+    """Reads the direction of a signal, a bool or numpy bool, True for long, or the legacy 'LONG' or 'SHORT' string."""
+    return direction == 'LONG' if isinstance(direction, str) else bool(direction)
+
 class OrderGenerator(object):
     def __init__(self):
         pass
     def generate_order(self, signal: SignalEvent):
         return None
-    
+
+    def generate_orders(self, signals: list[SignalEvent], portfolio: Portfolio) -> list[OrderEvent]:
+        """Turns a batch of signals into orders. Defaults to calling generate_order on each signal.
+
+        Args:
+            signals (list[SignalEvent]): The signals of a bar.
+            portfolio (Portfolio): The portfolio the orders are for.
+
+        Returns:
+            list[OrderEvent]: The orders to place.
+        """
+        orders = []
+        for signal in signals:
+            order = self.generate_order(signal)
+            if order is not None:
+                orders.append(order)
+        return orders
+
 class NaiveOrderGenerator(OrderGenerator):
     def generate_order(self, signal: SignalEvent):
-        if signal.direction == 'LONG':
+        if is_long(signal.direction):
             return OrderEvent(symbol=signal.symbol, timestamp=signal.timestamp, order_type='market', quantity=1)
         else:
-            return OrderEvent(symbol=signal.symbol, timestamp=signal.timestamp, order_type='market', quantity=-1)
\ No newline at end of file
+            return OrderEvent(symbol=signal.symbol, timestamp=signal.timestamp, order_type='market', quantity=-1)
+
+class SizingOrderGenerator(OrderGenerator):
+    """A SizingOrderGenerator turns the signals of a bar into target positions at once, and orders only
+    the difference with the positions held.
+
+    Each signal targets a position risking risk_fraction of the total value of the portfolio per unit of
+    strength, given the volatility of the per bar returns of its symbol over the trailing window. Positions
+    are capped at max_weight of the total value, which also sizes symbols without enough history to estimate
+    their volatility. A signal with the default strength of 0 is sized at full strength, and a negative
+    strength targets a flat position. When a symbol has several signals on a bar, only the last one is used.
+
+    Targets are netted against the positions held, not against orders still waiting to be filled, so with
+    a latency strategies should only signal when their view of a symbol changes. Sizing needs the portfolio,
+    so it only happens in generate_orders, and generate_order returns None.
+
+    Attributes:
+        risk_fraction (float): The volatility of the value of a full strength position, as a fraction of the total value.
+        max_weight (float): The largest market value of a position, as a fraction of the total value.
+        window (int): The number of trailing returns the volatility is estimated from.
+        order_type (str): The type of the orders generated.
+    """
+    def __init__(self, risk_fraction: float = 0.01, max_weight: float = 0.1, window: int = 20, order_type: str = 'market'):
+        """Constructor method
+
+        Args:
+            risk_fraction (float, optional): The volatility of the value of a full strength position per bar, as a
+                fraction of the total value. Defaults to 0.01.
+            max_weight (float, optional): The largest market value of a position, as a fraction of the total value. Defaults to 0.1.
+            window (int, optional): The number of trailing returns the volatility is estimated from. Defaults to 20.
+            order_type (str, optional): The type of the orders generated. Defaults to 'market'.
+        """
+        self.risk_fraction = risk_fraction
+        self.max_weight = max_weight
+        self.window = window
+        self.order_type = order_type
+
+    def volatility(self, closes: list[np.ndarray]) -> np.ndarray:
+        """Estimates the volatility of the per bar returns of several symbols at once.
+
+        Args:
+            closes (list[np.ndarray]): The trailing closes of each symbol.
+
+        Returns:
+            np.ndarray: The standard deviation of the returns of each symbol, NaN without a full window.
+        """
+        result = np.full(len(closes), np.nan)
+        full = [i for i, values in enumerate(closes) if len(values) > self.window]
+        if full:
+            matrix = np.stack([closes[i][-self.window - 1:] for i in full])
+            returns = matrix[:, 1:] / matrix[:, :-1] - 1
+            result[full] = np.std(returns, axis=1, ddof=1) if self.window > 1 else np.abs(returns[:, 0])
+        return result
+
+    def generate_orders(self, signals: list[SignalEvent], portfolio: Portfolio) -> list[OrderEvent]:
+        """Sizes the target position of each signalled symbol, and orders the difference with its position.
+
+        Args:
+            signals (list[SignalEvent]): The signals of a bar.
+            portfolio (Portfolio): The portfolio the orders are for.
+
+        Returns:
+            list[OrderEvent]: One order per symbol whose target differs from its position.
+        """
+        latest = {signal.symbol: signal for signal in signals}
+        if not latest:
+            return []
+
+        data_handler = portfolio.data_handler
+        book = portfolio.positions
+        symbols = list(latest)
+        count = len(symbols)
+
+        ids = np.fromiter((book.get_id(symbol) for symbol in symbols), dtype=np.intp, count=count)
+        prices = np.fromiter((data_handler.get_latest_bar_value(symbol, 'close') for symbol in symbols), dtype=np.float64, count=count)
+        strengths = np.fromiter((latest[symbol].strength for symbol in symbols), dtype=np.float64, count=count)
+        strengths = np.where(strengths == 0, 1.0, np.maximum(strengths, 0))
+        sides = np.where([is_long(latest[symbol].direction) for symbol in symbols], 1, -1)
+        volatility = self.volatility([data_handler.get_latest_bar_values(symbol, 'close', self.window + 1) for symbol in symbols])
+
+        # Value of one contract in the currency of the balance
+        contract_values = prices * book.point_value[ids]
+        capital = portfolio.total_value
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cap = self.max_weight * capital / contract_values
+            sized = self.risk_fraction * capital / (contract_values * volatility)
+        sized = np.where(np.isfinite(sized), np.minimum(sized, cap), cap)
+        targets = np.fix(np.nan_to_num(sides * strengths * sized)).astype(np.int64)
+
+        deltas = targets - book.quantity[ids]
+        return [OrderEvent(symbols[i], latest[symbols[i]].timestamp, self.order_type, int(deltas[i]))
+                for i in np.flatnonzero(deltas)]
@@ -1,7 +1,18 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from analysis.statistics import PerformanceStatistics
 from generators.event_queue import EventQueue
-from handlers.datahandler import DataHandler
-from events.events import FillEvent, SignalEvent
+from events.events import EventType, FillEvent, MarketEvent, OrderEvent, SignalEvent
+from generators.contracts import ContractTable
 from generators.order_generator import OrderGenerator
+from generators.position_book import PositionBook
+
+if TYPE_CHECKING:
+    from handlers.datahandler import DataHandler
 
 class Portfolio(object):
     """A portfolio object represents all of the user's current holdings
@@ -12,17 +23,32 @@ class Portfolio(object):
         data_handler (DataHandler): The DataHandler object providing data to the portfolio.
         event_queue (EventQueue): The EventQueue object providing events to the portfolio.
         balance (float): The user's current cash balance.
-        positions (dict): A dictionary containing the user's current holdings.
+        positions (PositionBook): The book holding the user's current holdings, their marks and realized profits.
         total_value (float): The total value of the user's portfolio, including balance and holdings.
-        futures (float): The value of a one point move in the futures contract, default 1 (as 1 point move = $1 for equities).
+        contract_value (float): The value of a one point move of symbols without a contract spec, default 1 (as 1 point move = $1 for equities).
+        holdings_value (float): The total market value of all positions.
+        gross_value (float): The total absolute market value of all positions.
+        cost_value (float): The total value of all positions at their entry prices.
+        realized_pnl (float): The total profit realized by reducing positions.
+        margin_used (float): The total margin required by all positions.
+        rejected_orders (int): The number of orders rejected for lack of margin.
+        periods (int): The number of entries recorded in the equity time series.
+        statistics (PerformanceStatistics): The performance statistics, updated as periods are recorded and fills booked.
     """
-    def __init__(self, data_handler: DataHandler, event_queue: EventQueue, order_generator: OrderGenerator, balance: float, contract_value: float = 1):
+    def __init__(self, data_handler: DataHandler, event_queue: EventQueue, order_generator: OrderGenerator, balance: float, contract_value: float = 1,
+                 expected_periods: int = 1024, periods_per_year: float = 252, contracts: ContractTable = None):
         """Constructor method
 
         Args:
             data_handler (DataHandler): The data handler object providing data to the portfolio.
             event_queue (EventQueue): The event queue object providing events to the portfolio.
+            order_generator (OrderGenerator): The order generator turning signals into orders.
             balance (float): The user's starting cash balance.
+            contract_value (float, optional): The value of a one point move in the contract. Defaults to 1.
+            expected_periods (int, optional): The initial capacity of the equity time series, grown as needed. Defaults to 1024.
+            periods_per_year (float, optional): The number of periods in a year, used to annualize the statistics. Defaults to 252.
+            contracts (ContractTable, optional): The contract specs of the symbols and the exchange rates into the currency of
+                the balance. Defaults to None, every symbol having a multiplier of contract_value and no margin.
         """
 
         # Handlers
@@ -31,65 +57,103 @@ class Portfolio(object):
         self.order_generator = order_generator
 
         # Stock holdings
-        # Each entry will be a dictionary containing the **starting** price (price when trade was entered) and quantity
-        # Example: {"MNQ": {"price": 100, "quantity": 10}}
-        self.positions = {}
+        # Each symbol has an id into the arrays of the book, holding the **starting** price (price when trade was entered) and quantity
+        self.positions = PositionBook(contract_value, contracts=contracts)
         
         # Equity
         self.balance = balance
         self.total_value = balance
         self.contract_value = contract_value
 
-    def update(self):
-        """Updates the user's balance and total value based on the current price of assets. Called
-        upon a new MarketEvent.
-        """
-        for symbol, position in self.positions.items():
-            self.total_value = self.balance
+        # Running aggregates, only updated for symbols whose price changed or which had a fill
+        self.holdings_value = 0.0
+        self.gross_value = 0.0
+        self.cost_value = 0.0
+        self.realized_pnl = 0.0
+        self.margin_used = 0.0
+        self.rejected_orders = 0
 
-            # Get latest price
-            latest_price = self.data_handler.get_latest_bar_value(symbol, 'close')
-            change_in_total = (latest_price - position['price']) * position['quantity'] * self.contract_value
-            starting_total = position['price'] * position['quantity'] * self.contract_value
+        # Equity time series, one entry per recorded period
+        self.periods = 0
+        self.timestamps = np.empty(expected_periods, dtype='datetime64[us]')
+        self.cash_series = np.empty(expected_periods, dtype=np.float64)
+        self.holdings_series = np.empty(expected_periods, dtype=np.float64)
+        self.equity_series = np.empty(expected_periods, dtype=np.float64)
+        self.statistics = PerformanceStatistics(balance, periods_per_year)
+
+    @property
+    def unrealized_pnl(self) -> float:
+        """The profit or loss of all open positions relative to their entry prices."""
+        return self.holdings_value - self.cost_value
 
-            total = starting_total + change_in_total
-            self.total_value += total
+    @property
+    def buying_power(self) -> float:
+        """The total value of the portfolio not required as margin."""
+        return self.total_value - self.margin_used
 
-    def __update_buy(self, position: dict, fill_event: FillEvent):
-        """Updates the portfolio based on a new buy FillEvent.
+    @property
+    def equity_curve(self) -> np.ndarray:
+        """A view of the recorded total value of the portfolio, one entry per period."""
+        return self.equity_series[:self.periods]
+
+    def __mark(self, index: int, price: float):
+        """Revalues a single position at a new price, updating the running aggregates.
 
         Args:
-            position (dict): The position being updated.
-            fill_event (FillEvent): The FillEvent being used to update the portfolio.
+            index (int): The id of the symbol of the position.
+            price (float): The new price of the symbol.
         """
-        latest_price = self.data_handler.get_latest_bar_value(fill_event.symbol, 'close')
-        # Update position
-        if position['quantity'] > 0:
-            position['price'] = (position['price'] * position['quantity'] + latest_price * fill_event.quantity)/(position['quantity'] + fill_event.quantity)
-            position['quantity'] += fill_event.quantity
-        else: # Current position is short
-            position['quantity'] += fill_event.quantity
+        book = self.positions
+        market_value = price * book.quantity[index] * book.point_value[index]
+        self.holdings_value += market_value - book.market_value[index]
+        self.gross_value += abs(market_value) - abs(book.market_value[index])
+        book.market_value[index] = market_value
+        book.mark_price[index] = price
+        self.total_value = self.balance + self.holdings_value
+
+    def update(self, market_event: MarketEvent = None):
+        """Updates the user's total value based on the current price of assets. Called upon a new
+        MarketEvent. Only the positions of the symbols named by the event are revalued, and only if
+        their price changed.
+
+        Args:
+            market_event (MarketEvent, optional): The MarketEvent being processed. Defaults to None, revaluing every position.
+        """
+        ids = self.positions.ids
+        symbols = ids
+        if market_event is not None and market_event.symbols is not None and len(market_event.symbols) < len(ids):
+            symbols = market_event.symbols
+
+        mark_price = self.positions.mark_price
+        for symbol in symbols:
+            index = ids.get(symbol)
+            if index is None:
+                continue
 
-            if position['quantity'] > 0:
-                position['price'] = latest_price
+            latest_price = self.data_handler.get_latest_bar_value(symbol, 'close')
+            if latest_price != mark_price[index]:
+                self.__mark(index, latest_price)
 
-    def __update_sell(self, position: dict, fill_event: FillEvent):
-        """Updates the portfolio based on a new sell FillEvent.
+    def record(self, timestamp=None):
+        """Appends the current cash, holdings and total value to the equity time series. Called once all the events
+        of a period have been processed.
 
         Args:
-            position (dict): The position being updated.
-            fill_event (FillEvent): The FillEvent being used to update the portfolio.
+            timestamp (optional): The timestamp of the period. Defaults to None.
         """
-        latest_price = self.data_handler.get_latest_bar_value(fill_event.symbol, 'close')
-        # Update position
-        if position['quantity'] < 0:
-            position['price'] = (position['price'] * -position['quantity'] + latest_price * fill_event.quantity)/(-position['quantity'] + fill_event.quantity)
-            position['quantity'] -= fill_event.quantity
-        else:
-            position['quantity'] -= fill_event.quantity
+        if self.periods == len(self.timestamps):
+            capacity = max(2 * self.periods, 1)
+            self.timestamps = np.resize(self.timestamps, capacity)
+            self.cash_series = np.resize(self.cash_series, capacity)
+            self.holdings_series = np.resize(self.holdings_series, capacity)
+            self.equity_series = np.resize(self.equity_series, capacity)
 
-            if position['quantity'] < 0:
-                position['price'] = latest_price
+        self.timestamps[self.periods] = timestamp if timestamp is not None else np.datetime64('NaT')
+        self.cash_series[self.periods] = self.balance
+        self.holdings_series[self.periods] = self.holdings_value
+        self.equity_series[self.periods] = self.total_value
+        self.periods += 1
+        self.statistics.update_period(self.total_value, self.gross_value)
 
     def update_fill(self, fill_event: FillEvent):
         """Updates the portfolio based on a new FillEvent.
@@ -99,45 +163,189 @@ class Portfolio(object):
         """
 
         # Validate event type
-        if fill_event.type != 'FILL':
+        if fill_event.type != EventType.FILL:
             return
         
+        book = self.positions
+        index = book.get_id(fill_event.symbol)
         latest_price = self.data_handler.get_latest_bar_value(fill_event.symbol, 'close')
-        
-        # Update positions
-        if fill_event.direction == 'BUY':
-            self.balance -= latest_price * fill_event.quantity
-            if fill_event.symbol not in self.positions:
-                self.positions[fill_event.symbol] = {"price": fill_event.fill_cost, "quantity": fill_event.quantity}
-            else:
-                self.__update_buy(self.positions[fill_event.symbol], fill_event)
-        else:
-            self.balance += latest_price * fill_event.quantity
-            if fill_event.symbol not in self.positions:
-                self.positions[fill_event.symbol] = {"price": fill_event.fill_cost, "quantity": -fill_event.quantity}
-            else:
-                self.__update_sell(self.positions[fill_event.symbol], fill_event)
+        fill_price = latest_price if fill_event.price is None else fill_event.price
+        quantity = fill_event.quantity if fill_event.direction == 'BUY' else -fill_event.quantity
 
         # Update balance
-        transaction_value = latest_price * fill_event.quantity
+        point_value = book.point_value[index]
+        transaction_value = fill_price * fill_event.quantity * point_value
         transaction_fees = transaction_value * fill_event.commission + fill_event.fill_cost * fill_event.quantity
-        self.balance -= transaction_fees
+        self.balance -= fill_price * quantity * point_value + transaction_fees
+
+        # Update positions, still marked at the latest close
+        old_cost = book.cost_value[index]
+        old_quantity = book.quantity[index]
+        realized = book.update_fill(index, quantity, fill_price)
+        self.realized_pnl += realized
+        self.cost_value += book.cost_value[index] - old_cost
+        self.margin_used += (abs(book.quantity[index]) - abs(old_quantity)) * book.margin[index]
+        self.__mark(index, latest_price)
+        self.statistics.update_fill(transaction_value, realized)
+
+    def update_fills(self, fill_events: list[FillEvent]):
+        """Updates the portfolio based on a batch of FillEvents at once, giving the same result as calling
+        update_fill on each of them in order.
+
+        Args:
+            fill_events (list[FillEvent]): The FillEvents being used to update the portfolio.
+        """
+        fill_events = [fill_event for fill_event in fill_events if fill_event.type == EventType.FILL]
+        if not fill_events:
+            return
+
+        book = self.positions
+        count = len(fill_events)
+        ids = np.fromiter((book.get_id(fill_event.symbol) for fill_event in fill_events), dtype=np.intp, count=count)
+        latest_prices = np.fromiter((self.data_handler.get_latest_bar_value(fill_event.symbol, 'close') for fill_event in fill_events),
+                                    dtype=np.float64, count=count)
+        prices = np.fromiter((np.nan if fill_event.price is None else fill_event.price for fill_event in fill_events),
+                             dtype=np.float64, count=count)
+        prices = np.where(np.isnan(prices), latest_prices, prices)
+        sizes = np.fromiter((fill_event.quantity for fill_event in fill_events), dtype=np.int64, count=count)
+        quantities = np.where([fill_event.direction == 'BUY' for fill_event in fill_events], sizes, -sizes)
+        commissions = np.fromiter((fill_event.commission for fill_event in fill_events), dtype=np.float64, count=count)
+        fill_costs = np.fromiter((fill_event.fill_cost for fill_event in fill_events), dtype=np.float64, count=count)
+
+        # Update balance
+        point_values = book.point_value[ids]
+        transaction_values = prices * sizes * point_values
+        transaction_fees = transaction_values * commissions + fill_costs * sizes
+        self.balance -= np.sum(prices * quantities * point_values) + np.sum(transaction_fees)
+
+        # Update positions, marking each symbol at its latest close
+        symbols, last = np.unique(ids[::-1], return_index=True)
+        last = count - 1 - last
+
+        old_cost = np.sum(book.cost_value[symbols])
+        old_margin = np.sum(np.abs(book.quantity[symbols]) * book.margin[symbols])
+        realized = book.update_fills(ids, quantities, prices)
+        self.realized_pnl += np.sum(realized)
+        self.cost_value += np.sum(book.cost_value[symbols]) - old_cost
+        self.margin_used += np.sum(np.abs(book.quantity[symbols]) * book.margin[symbols]) - old_margin
+
+        market_values = latest_prices[last] * book.quantity[symbols] * book.point_value[symbols]
+        self.holdings_value += np.sum(market_values - book.market_value[symbols])
+        self.gross_value += np.sum(np.abs(market_values) - np.abs(book.market_value[symbols]))
+        book.market_value[symbols] = market_values
+        book.mark_price[symbols] = latest_prices[last]
+        self.total_value = self.balance + self.holdings_value
+        self.statistics.update_fills(transaction_values, realized)
 
     def update_signal(self, signal_event: SignalEvent):
-        """Generates a new order based on a new SignalEvent. Either adds a new OrderEvent or None,
-        if no order is to be made.
+        """Generates the orders of a new SignalEvent, if any, dropping those the portfolio lacks the margin for.
 
         Args:
             signal_event (Event): The SignalEvent being used to generate a new order.
         """
         # Validate event type
-        if signal_event.type != 'SIGNAL':
+        if signal_event.type != EventType.SIGNAL:
             return
-        
-        self.event_queue.put(self.order_generator.generate_order(signal_event))
+
+        for order_event in self.order_generator.generate_orders([signal_event], self):
+            if not self.check_order(order_event):
+                self.rejected_orders += 1
+                continue
+            self.event_queue.put(order_event)
+
+    def update_signals(self, signal_events: list[SignalEvent]):
+        """Generates the orders of a batch of SignalEvents at once, so the order generator can size them
+        together, and checks their margin as a batch.
+
+        Args:
+            signal_events (list[SignalEvent]): The SignalEvents being used to generate new orders.
+        """
+        signal_events = [signal_event for signal_event in signal_events if signal_event.type == EventType.SIGNAL]
+        order_events = self.order_generator.generate_orders(signal_events, self)
+        if not order_events:
+            return
+
+        accepted = self.check_orders(order_events)
+        for order_event, ok in zip(order_events, accepted):
+            if ok:
+                self.event_queue.put(order_event)
+        self.rejected_orders += len(order_events) - int(np.count_nonzero(accepted))
+
+    def check_order(self, order_event: OrderEvent) -> bool:
+        """Checks whether the portfolio has the margin to hold the position an order would leave. Orders
+        reducing the margin required are always accepted.
+
+        Args:
+            order_event (OrderEvent): The order to check.
+
+        Returns:
+            bool: True if the order is accepted.
+        """
+        book = self.positions
+        index = book.get_id(order_event.symbol)
+        margin = book.margin[index]
+        if not margin:
+            return True
+
+        quantity = book.quantity[index]
+        required = (abs(quantity + order_event.quantity) - abs(quantity)) * margin
+        return required <= 0 or self.margin_used + required <= self.total_value
+
+    def check_orders(self, order_events: list[OrderEvent]) -> np.ndarray:
+        """Checks a batch of orders at once, as if they were filled in order, so an order gives the same
+        answer as check_order would once every earlier order of the batch is filled. Orders reducing the
+        margin required are always accepted and free margin for the later orders, and the others are
+        accepted while the margin used after them stays within the buying power.
+
+        Args:
+            order_events (list[OrderEvent]): The orders to check.
+
+        Returns:
+            np.ndarray: A boolean array, True for each accepted order.
+        """
+        count = len(order_events)
+        if not count:
+            return np.ones(0, dtype=bool)
+
+        book = self.positions
+        ids = np.fromiter((book.get_id(order_event.symbol) for order_event in order_events), dtype=np.intp, count=count)
+        quantities = np.fromiter((order_event.quantity for order_event in order_events), dtype=np.int64, count=count)
+
+        # Position held before each order, following the earlier orders of the same symbol
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        totals = np.cumsum(quantities[order])
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        group_offsets = np.repeat(totals[starts] - quantities[order][starts], np.diff(np.r_[starts, count]))
+        after = np.empty(count, dtype=np.int64)
+        after[order] = totals - group_offsets
+        after += book.quantity[ids]
+        before = after - quantities
+
+        required = (np.abs(after) - np.abs(before)) * book.margin[ids]
+        added = np.cumsum(required)
+        return (required <= 0) | (self.margin_used + added <= self.total_value)
+
+    def set_fx_rate(self, currency: str, rate: float):
+        """Changes the exchange rate of a currency into the currency of the balance, revaluing the positions
+        of every symbol priced in it.
+
+        Args:
+            currency (str): The currency to convert from.
+            rate (float): The value of one unit of the currency in the currency of the balance.
+        """
+        book = self.positions
+        book.set_rate(currency, rate)
+
+        count = len(book)
+        self.holdings_value = float(np.sum(book.market_value[:count]))
+        self.gross_value = float(np.sum(np.abs(book.market_value[:count])))
+        self.cost_value = float(np.sum(book.cost_value[:count]))
+        self.margin_used = float(np.sum(np.abs(book.quantity[:count]) * book.margin[:count]))
+        self.total_value = self.balance + self.holdings_value
 
 
     def print_status(self):
         """Prints a summary of the user's current portfolio to the console, including positions, balance, and total value.
         """
-        print(f'Portfolio Summary: Cash={self.balance}, Total Value={self.total_value},\nPositions:{self.positions}')
\ No newline at end of file
+        print(f'Portfolio Summary: Cash={self.balance}, Total Value={self.total_value}, Margin Used={self.margin_used},\nPositions:{self.positions.as_dict()}')
\ No newline at end of file
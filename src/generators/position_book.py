@@ -0,0 +1,236 @@
+import numpy as np
+
+from generators.contracts import ContractSpec, ContractTable
+
+class PositionBook(object):
+    """A PositionBook holds the positions of a portfolio in parallel NumPy arrays indexed by an integer id
+    per symbol, instead of a dictionary of dictionaries. Prices are average entry prices, quantities are
+    signed (negative for short positions) and realized profits are accumulated as positions are reduced.
+
+    The contract spec of each symbol is copied into the arrays when the symbol is added, and values are
+    converted into the base currency of the contract table, so profits and market values of every symbol
+    can be summed.
+
+    Attributes:
+        contract_value (float): The value of a one point move of symbols without a contract spec.
+        contracts (ContractTable): The contract specs and exchange rates of the symbols.
+        ids (dict): A dictionary mapping each symbol to its id.
+        symbols (list[str]): The symbol of each id.
+        price (np.ndarray): The average entry price of each position.
+        quantity (np.ndarray): The signed quantity of each position.
+        realized_pnl (np.ndarray): The profit realized so far on each symbol.
+        mark_price (np.ndarray): The latest price each position was valued at, nan if never valued.
+        market_value (np.ndarray): The value of each position at its mark price.
+        cost_value (np.ndarray): The value of each position at its entry price.
+        multiplier (np.ndarray): The value of a one point move of one contract of each symbol, in its currency.
+        fx_rate (np.ndarray): The value of one unit of the currency of each symbol in the base currency.
+        point_value (np.ndarray): The value of a one point move of one contract of each symbol in the base currency.
+        margin (np.ndarray): The margin required per contract of each symbol in the base currency.
+        currency_id (np.ndarray): The id of the currency of each symbol in the contract table.
+    """
+    def __init__(self, contract_value: float = 1, capacity: int = 16, contracts: ContractTable = None):
+        """Constructor method
+
+        Args:
+            contract_value (float, optional): The value of a one point move of symbols without a contract spec. Defaults to 1.
+            capacity (int, optional): The initial number of symbols the arrays can hold, grown as needed. Defaults to 16.
+            contracts (ContractTable, optional): The contract specs and exchange rates of the symbols. Defaults to None,
+                every symbol having a multiplier of contract_value and no margin.
+        """
+        self.contract_value = contract_value
+        self.contracts = contracts if contracts is not None else ContractTable(default=ContractSpec(multiplier=contract_value))
+        self.ids = {}
+        self.symbols = []
+
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.quantity = np.zeros(capacity, dtype=np.int64)
+        self.realized_pnl = np.zeros(capacity, dtype=np.float64)
+        self.mark_price = np.full(capacity, np.nan, dtype=np.float64)
+        self.market_value = np.zeros(capacity, dtype=np.float64)
+        self.cost_value = np.zeros(capacity, dtype=np.float64)
+        self.multiplier = np.zeros(capacity, dtype=np.float64)
+        self.fx_rate = np.zeros(capacity, dtype=np.float64)
+        self.point_value = np.zeros(capacity, dtype=np.float64)
+        self.margin = np.zeros(capacity, dtype=np.float64)
+        self.currency_id = np.zeros(capacity, dtype=np.intp)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.ids
+
+    def get_id(self, symbol: str) -> int:
+        """Returns the id of a symbol, adding it to the book with an empty position if needed.
+
+        Args:
+            symbol (str): The symbol to look up.
+
+        Returns:
+            int: The id of the symbol.
+        """
+        index = self.ids.get(symbol)
+        if index is not None:
+            return index
+
+        index = len(self.symbols)
+        if index == len(self.price):
+            pad = index
+            self.price = np.concatenate((self.price, np.zeros(pad)))
+            self.quantity = np.concatenate((self.quantity, np.zeros(pad, dtype=np.int64)))
+            self.realized_pnl = np.concatenate((self.realized_pnl, np.zeros(pad)))
+            self.mark_price = np.concatenate((self.mark_price, np.full(pad, np.nan)))
+            self.market_value = np.concatenate((self.market_value, np.zeros(pad)))
+            self.cost_value = np.concatenate((self.cost_value, np.zeros(pad)))
+            self.multiplier = np.concatenate((self.multiplier, np.zeros(pad)))
+            self.fx_rate = np.concatenate((self.fx_rate, np.zeros(pad)))
+            self.point_value = np.concatenate((self.point_value, np.zeros(pad)))
+            self.margin = np.concatenate((self.margin, np.zeros(pad)))
+            self.currency_id = np.concatenate((self.currency_id, np.zeros(pad, dtype=np.intp)))
+
+        spec = self.contracts.get(symbol)
+        rate = self.contracts.rate(spec.currency)
+        self.multiplier[index] = spec.multiplier
+        self.fx_rate[index] = rate
+        self.point_value[index] = spec.multiplier * rate
+        self.margin[index] = spec.margin * rate
+        self.currency_id[index] = self.contracts.currency_id(spec.currency)
+
+        self.ids[symbol] = index
+        self.symbols.append(symbol)
+        return index
+
+    def set_rate(self, currency: str, rate: float):
+        """Changes the exchange rate of a currency, revaluing the positions of every symbol priced in it at
+        their entry and mark prices. Profits already realized keep the rate they were realized at.
+
+        Args:
+            currency (str): The currency to convert from.
+            rate (float): The value of one unit of the currency in the base currency.
+        """
+        self.contracts.set_rate(currency, rate)
+        count = len(self.symbols)
+        selected = np.flatnonzero(self.currency_id[:count] == self.contracts.currency_id(currency))
+        if not len(selected):
+            return
+
+        margins = self.margin[selected] / self.fx_rate[selected]
+        self.fx_rate[selected] = rate
+        self.point_value[selected] = self.multiplier[selected] * rate
+        self.margin[selected] = margins * rate
+        self.cost_value[selected] = self.price[selected] * self.quantity[selected] * self.point_value[selected]
+        marks = np.nan_to_num(self.mark_price[selected])
+        self.market_value[selected] = marks * self.quantity[selected] * self.point_value[selected]
+
+    def update_fill(self, index: int, quantity: int, price: float) -> float:
+        """Applies a single fill to a position.
+
+        Args:
+            index (int): The id of the symbol.
+            quantity (int): The signed quantity filled, positive for a buy and negative for a sell.
+            price (float): The price of the fill.
+
+        Returns:
+            float: The profit realized by the fill.
+        """
+        if quantity == 0:
+            return 0.0
+
+        old_quantity = int(self.quantity[index])
+        old_price = float(self.price[index])
+        new_quantity = old_quantity + quantity
+        realized = 0.0
+
+        if old_quantity == 0 or (old_quantity > 0) == (quantity > 0):
+            # Opening or adding to the position
+            self.price[index] = (old_price * abs(old_quantity) + price * abs(quantity)) / abs(new_quantity)
+        else:
+            # Reducing the position, possibly flipping it
+            closed = min(abs(quantity), abs(old_quantity))
+            realized = closed * (price - old_price) * (1 if old_quantity > 0 else -1) * self.point_value[index]
+            if new_quantity != 0 and (new_quantity > 0) != (old_quantity > 0):
+                self.price[index] = price
+
+        self.quantity[index] = new_quantity
+        self.realized_pnl[index] += realized
+        self.cost_value[index] = self.price[index] * new_quantity * self.point_value[index]
+        return realized
+
+    def update_fills(self, ids: np.ndarray, quantities: np.ndarray, prices: np.ndarray) -> np.ndarray:
+        """Applies a batch of fills at once, giving the same result as applying them one by one in order.
+        The fills are split into rounds holding at most one fill per symbol, each round being applied with
+        vectorized average price math, so a batch over distinct symbols takes a single round.
+
+        Args:
+            ids (np.ndarray): The id of the symbol of each fill.
+            quantities (np.ndarray): The signed quantity of each fill, positive for a buy and negative for a sell.
+            prices (np.ndarray): The price of each fill.
+
+        Returns:
+            np.ndarray: The profit realized by each fill.
+        """
+        ids = np.asarray(ids, dtype=np.intp)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        realized = np.zeros(len(ids), dtype=np.float64)
+        if not len(ids):
+            return realized
+
+        # Rank each fill among the fills of its symbol
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        positions = np.arange(len(ids))
+        group_starts = np.maximum.accumulate(np.where(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]], positions, 0))
+        ranks = np.empty(len(ids), dtype=np.intp)
+        ranks[order] = positions - group_starts
+
+        rounds = int(ranks.max()) + 1
+        if rounds == 1:
+            return self.__apply_fills(ids, quantities, prices)
+
+        for round_number in range(rounds):
+            selected = np.flatnonzero(ranks == round_number)
+            realized[selected] = self.__apply_fills(ids[selected], quantities[selected], prices[selected])
+
+        return realized
+
+    def __apply_fills(self, ids: np.ndarray, quantities: np.ndarray, prices: np.ndarray) -> np.ndarray:
+        """Applies fills on distinct symbols.
+
+        Args:
+            ids (np.ndarray): The distinct ids of the symbols of the fills.
+            quantities (np.ndarray): The signed quantity of each fill.
+            prices (np.ndarray): The price of each fill.
+
+        Returns:
+            np.ndarray: The profit realized by each fill.
+        """
+        old_quantities = self.quantity[ids]
+        old_prices = self.price[ids]
+        new_quantities = old_quantities + quantities
+
+        adding = (old_quantities == 0) | (np.sign(old_quantities) == np.sign(quantities))
+        flipped = ~adding & (np.sign(new_quantities) == np.sign(quantities))
+
+        closed = np.where(adding, 0, np.minimum(np.abs(quantities), np.abs(old_quantities)))
+        point_values = self.point_value[ids]
+        realized = closed * (prices - old_prices) * np.sign(old_quantities) * point_values
+
+        sizes = np.abs(new_quantities)
+        averages = (old_prices * np.abs(old_quantities) + prices * np.abs(quantities)) / np.where(sizes == 0, 1, sizes)
+        new_prices = np.where(adding, averages, np.where(flipped, prices, old_prices))
+
+        self.price[ids] = new_prices
+        self.quantity[ids] = new_quantities
+        self.realized_pnl[ids] += realized
+        self.cost_value[ids] = new_prices * new_quantities * point_values
+        return realized
+
+    def as_dict(self) -> dict:
+        """Lists the positions in the format {"MNQ": {"price": 100, "quantity": 10}}.
+
+        Returns:
+            dict: A dictionary mapping each symbol to its entry price and quantity.
+        """
+        return {symbol: {"price": float(self.price[index]), "quantity": int(self.quantity[index])}
+                for symbol, index in self.ids.items()}
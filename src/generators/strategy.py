@@ -1,6 +1,15 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
 from events.events import SignalEvent
 from generators.event_queue import EventQueue
-from handlers.datahandler import DataHandler
+from handlers.bars import Columns
+
+if TYPE_CHECKING:
+    from handlers.datahandler import DataHandler
 
 class Strategy(object):
     """An base class for strategy objects, which are responsible for generating trading signals based on market data.
@@ -27,3 +36,33 @@ class Strategy(object):
 
 class SampleStrategy(Strategy):
     pass
+
+class VectorStrategy(object):
+    """A base class for strategies that are pure functions of price history, which can be run by the
+    VectorizedBackTest over the full price arrays at once instead of bar by bar.
+
+    Subclasses implement either calculate_signals, returning the trades to make on each bar, or
+    calculate_positions, returning the position to hold after each bar.
+    """
+    def calculate_signals(self, bars: dict[str, Columns]) -> dict[str, np.ndarray]:
+        """Generates the trading signals over the full history.
+
+        Args:
+            bars (dict[str, Columns]): A dictionary mapping each symbol to its column arrays.
+
+        Returns:
+            dict[str, np.ndarray]: A dictionary mapping each symbol to an array with one entry per bar,
+            1 to buy one contract on that bar, -1 to sell one and 0 to do nothing.
+        """
+        return {symbol: np.zeros(len(columns['datetime']), dtype=np.int64) for symbol, columns in bars.items()}
+
+    def calculate_positions(self, bars: dict[str, Columns]) -> dict[str, np.ndarray]:
+        """Generates the positions held over the full history. Defaults to accumulating the signals.
+
+        Args:
+            bars (dict[str, Columns]): A dictionary mapping each symbol to its column arrays.
+
+        Returns:
+            dict[str, np.ndarray]: A dictionary mapping each symbol to the signed quantity held after each bar.
+        """
+        return {symbol: np.cumsum(signals) for symbol, signals in self.calculate_signals(bars).items()}
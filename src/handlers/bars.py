@@ -0,0 +1,301 @@
+""" This module holds the columnar bar storage used by the data handlers. """
+import csv
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+
+import numpy as np
+
+# Column names of an Entry, in order
+COLUMNS = ('datetime', 'open', 'high', 'low', 'close', 'adj_close', 'volume')
+
+DTYPES = {
+    'datetime': np.dtype('datetime64[us]'),
+    'open': np.dtype(np.float64),
+    'high': np.dtype(np.float64),
+    'low': np.dtype(np.float64),
+    'close': np.dtype(np.float64),
+    'adj_close': np.dtype(np.float64),
+    'volume': np.dtype(np.int64)
+}
+
+# Type aliases
+Columns = dict[str, np.ndarray]
+
+def empty_columns() -> Columns:
+    """Creates a set of empty, correctly typed column arrays.
+
+    Returns:
+        Columns: A dictionary mapping each column name to an empty array.
+    """
+    return {name: np.empty(0, dtype=DTYPES[name]) for name in COLUMNS}
+
+def rows_to_columns(rows: list) -> Columns:
+    """Converts a list of Entry tuples, as returned by a database cursor, into typed column arrays.
+
+    Args:
+        rows (list): The rows to convert, each laid out as an Entry.
+
+    Returns:
+        Columns: A dictionary mapping each column name to a contiguous array.
+    """
+    if not rows:
+        return empty_columns()
+
+    return {name: np.asarray(values, dtype=DTYPES[name]) for name, values in zip(COLUMNS, zip(*rows))}
+
+def read_csv_rows(path: str) -> Iterator[tuple]:
+    """Reads the rows of a CSV file laid out as an Entry, skipping a header row if present. Only a first
+    row whose open is not a number is taken as a header.
+
+    Args:
+        path (str): The path of the CSV file.
+
+    Yields:
+        tuple: The next row, with its prices as floats and its volume as an int.
+
+    Raises:
+        ValueError: If any other row is too short or holds a value which is not a number.
+    """
+    with open(path, newline='') as file:
+        for line, row in enumerate(csv.reader(file), 1):
+            try:
+                entry = (row[0], float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5]), int(float(row[6])))
+            except (ValueError, IndexError):
+                if line == 1 and len(row) > 1 and not _is_number(row[1]):
+                    continue # Header row
+                raise ValueError(f"Invalid row at {path}:{line}: {row}") from None
+            yield entry
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+class BarFeed(ABC):
+    """A BarFeed holds the bars of a single symbol and reveals them one at a time as the backtest advances.
+    Only revealed bars are visible through latest() and window(), while peek_time() gives the time of the
+    next bar to be revealed, if has_next().
+    """
+    @abstractmethod
+    def has_next(self) -> bool:
+        pass
+
+    @abstractmethod
+    def peek_time(self) -> np.datetime64:
+        pass
+
+    @abstractmethod
+    def advance(self):
+        pass
+
+    @abstractmethod
+    def latest(self, field: str):
+        pass
+
+    @abstractmethod
+    def window(self, field: str, number_of_bars: int) -> np.ndarray:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def get_state(self):
+        """Returns the replay position of the feed, without the bars themselves unless they cannot be read again."""
+        pass
+
+    @abstractmethod
+    def set_state(self, state):
+        """Moves a freshly built feed over the same bars to a position returned by get_state."""
+        pass
+
+    def bars(self, number_of_bars: int) -> Columns:
+        """Returns the trailing window of every column.
+
+        Args:
+            number_of_bars (int): The maximum number of bars to return.
+
+        Returns:
+            Columns: A dictionary mapping each column name to a view of its trailing window.
+        """
+        return {name: self.window(name, number_of_bars) for name in COLUMNS}
+
+class ArrayBarFeed(BarFeed):
+    """A BarFeed over the full history of a symbol held in memory. Advancing only moves a cursor, and
+    windows are views into the underlying arrays, so no data is copied during the backtest.
+
+    Attributes:
+        columns (Columns): The full history of the symbol, one array per column.
+        length (int): The total number of bars in the history.
+        cursor (int): The number of bars revealed so far.
+    """
+    def __init__(self, columns: Columns):
+        """Constructor method
+
+        Args:
+            columns (Columns): The full history of the symbol, one array per column.
+        """
+        self.columns = columns
+        self.length = len(columns['datetime'])
+        self.cursor = 0
+
+    def has_next(self) -> bool:
+        return self.cursor < self.length
+
+    def peek_time(self) -> np.datetime64:
+        return self.columns['datetime'][self.cursor]
+
+    def advance(self):
+        self.cursor += 1
+
+    def latest(self, field: str):
+        return self.columns[field][self.cursor - 1]
+
+    def window(self, field: str, number_of_bars: int) -> np.ndarray:
+        return self.columns[field][max(self.cursor - number_of_bars, 0):self.cursor]
+
+    def __len__(self) -> int:
+        return self.cursor
+
+    def get_state(self) -> int:
+        return self.cursor
+
+    def set_state(self, state: int):
+        self.cursor = state
+
+class TrailingBarFeed(BarFeed):
+    """A base class for BarFeeds keeping only the trailing window of revealed bars in memory. Revealed bars
+    are written to a buffer of twice the lookback, which is compacted once full, so windows of up to
+    lookback bars are always contiguous views. Unlike ArrayBarFeed, views returned by window() are only
+    valid until the next call to advance().
+
+    Attributes:
+        lookback (int): The number of revealed bars guaranteed to remain visible.
+    """
+    def __init__(self, lookback: int):
+        """Constructor method
+
+        Args:
+            lookback (int): The number of revealed bars guaranteed to remain visible.
+        """
+        self.lookback = max(lookback, 1)
+
+        self.capacity = 2 * self.lookback
+        self.buffer = {name: np.empty(self.capacity, dtype=DTYPES[name]) for name in COLUMNS}
+        self.size = 0
+
+    def _next_slot(self) -> int:
+        """Makes room for a newly revealed bar, compacting the buffer if it is full.
+
+        Returns:
+            int: The index of the buffer the bar must be written at.
+        """
+        if self.size == self.capacity:
+            # Compact the buffer, keeping the trailing window
+            kept = self.capacity - self.lookback
+            for column in self.buffer.values():
+                column[:self.lookback] = column[kept:]
+            self.size = self.lookback
+
+        self.size += 1
+        return self.size - 1
+
+    def latest(self, field: str):
+        return self.buffer[field][self.size - 1]
+
+    def window(self, field: str, number_of_bars: int) -> np.ndarray:
+        return self.buffer[field][max(self.size - number_of_bars, 0):self.size]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _get_buffer(self) -> Columns:
+        """Returns a copy of the revealed bars still in the buffer."""
+        return {name: column[:self.size].copy() for name, column in self.buffer.items()}
+
+    def _set_buffer(self, bars: Columns):
+        """Replaces the revealed bars with bars returned by _get_buffer."""
+        self.size = len(bars['datetime'])
+        for name, column in self.buffer.items():
+            column[:self.size] = bars[name]
+
+class StreamBarFeed(TrailingBarFeed):
+    """A BarFeed reading the history of a symbol in batches, keeping only a bounded read-ahead buffer and
+    the trailing window of revealed bars in memory. Memory therefore depends on the lookback and the batch
+    size, not on the length of the history.
+
+    Attributes:
+        batches (Iterator[Columns]): The source of the bars, yielding column arrays in time order.
+        lookback (int): The number of revealed bars guaranteed to remain visible.
+    """
+    def __init__(self, batches: Iterator[Columns], lookback: int):
+        """Constructor method. Blocks until the first batch has been read.
+
+        Args:
+            batches (Iterator[Columns]): The source of the bars, yielding column arrays in time order.
+            lookback (int): The number of revealed bars guaranteed to remain visible.
+        """
+        super().__init__(lookback)
+        self.batches = batches
+
+        # Read-ahead buffer
+        self.pending = empty_columns()
+        self.pending_length = 0
+        self.position = 0
+        self.__read_batch()
+
+    def __read_batch(self):
+        """Replaces the read-ahead buffer with the next non-empty batch, if any.
+        """
+        self.position = 0
+        self.pending_length = 0
+        for batch in self.batches:
+            if len(batch['datetime']):
+                self.pending = batch
+                self.pending_length = len(batch['datetime'])
+                return
+        self.pending = empty_columns()
+
+    def has_next(self) -> bool:
+        return self.position < self.pending_length
+
+    def peek_time(self) -> np.datetime64:
+        return self.pending['datetime'][self.position]
+
+    def advance(self):
+        slot = self._next_slot()
+        for name, column in self.buffer.items():
+            column[slot] = self.pending[name][self.position]
+
+        self.position += 1
+        if self.position == self.pending_length:
+            self.__read_batch()
+
+    def get_state(self) -> Columns:
+        """Returns a copy of the revealed bars still in the buffer, as the batches cannot be rewound.
+
+        Returns:
+            Columns: The trailing revealed bars, one array per column.
+        """
+        return self._get_buffer()
+
+    def set_state(self, state: Columns):
+        """Restores the revealed bars, then skips the bars of the batches up to the latest of them. The
+        batches must start no later than the first bar after the restored ones.
+
+        Args:
+            state (Columns): The trailing revealed bars, as returned by get_state.
+        """
+        self._set_buffer(state)
+        if not self.size:
+            return
+
+        last = state['datetime'][-1]
+        while self.pending_length:
+            self.position = int(np.searchsorted(self.pending['datetime'], last, side='right'))
+            if self.position < self.pending_length:
+                break
+            self.__read_batch()
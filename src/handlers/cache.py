@@ -0,0 +1,132 @@
+""" This module holds an on-disk cache of bars, used to avoid re-querying unchanged history. """
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+
+from handlers.bars import COLUMNS, Columns
+
+class BarCache(object):
+    """A BarCache stores the bars of a table on disk, one .npy file per column, so they can be memory-mapped
+    back instead of being queried again. Entries are keyed by (table, start_date, end_date) and the least
+    recently used entries are evicted once the cache grows beyond max_bytes.
+
+    Attributes:
+        directory (str): The directory holding the cache entries.
+        max_bytes (int): The maximum total size of the cache in bytes.
+    """
+    def __init__(self, directory: str, max_bytes: int = 2 ** 30):
+        """Constructor method
+
+        Args:
+            directory (str): The directory holding the cache entries, created if missing.
+            max_bytes (int, optional): The maximum total size of the cache in bytes. Defaults to 1 GiB.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def __entry_path(self, table: str, start_date: datetime, end_date: datetime) -> str:
+        key = f"{table}|{start_date.isoformat()}|{end_date.isoformat() if end_date else ''}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{table}-{digest}")
+
+    def __read_meta(self, path: str) -> dict:
+        try:
+            with open(os.path.join(path, 'meta.json')) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def __write_meta(self, path: str, meta: dict):
+        tmp = os.path.join(path, 'meta.json.tmp')
+        with open(tmp, 'w') as file:
+            json.dump(meta, file)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+    def get(self, table: str, start_date: datetime, end_date: datetime = None) -> Columns:
+        """Memory-maps the cached bars of a table.
+
+        Args:
+            table (str): The table the bars were read from.
+            start_date (datetime): The start date the bars were queried with.
+            end_date (datetime, optional): The end date the bars were queried with. Defaults to None.
+
+        Returns:
+            Columns: Read-only memory-mapped column arrays, or None if the entry is not cached.
+        """
+        path = self.__entry_path(table, start_date, end_date)
+        meta = self.__read_meta(path)
+        if meta is None:
+            return None
+
+        try:
+            columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in COLUMNS}
+        except (OSError, ValueError):
+            return None
+
+        meta['last_used'] = time.time()
+        self.__write_meta(path, meta)
+        return columns
+
+    def put(self, table: str, start_date: datetime, end_date: datetime, columns: Columns) -> Columns:
+        """Stores the bars of a table, replacing any previous entry, then evicts entries if needed.
+
+        Args:
+            table (str): The table the bars were read from.
+            start_date (datetime): The start date the bars were queried with.
+            end_date (datetime): The end date the bars were queried with, None if open ended.
+            columns (Columns): The bars to store.
+
+        Returns:
+            Columns: The stored bars, memory-mapped from the cache.
+        """
+        path = self.__entry_path(table, start_date, end_date)
+        os.makedirs(path, exist_ok=True)
+
+        nbytes = 0
+        for name in COLUMNS:
+            # Write to a temporary file first, so readers never see a partial column
+            tmp = os.path.join(path, f"{name}.tmp.npy")
+            np.save(tmp, np.ascontiguousarray(columns[name]))
+            os.replace(tmp, os.path.join(path, f"{name}.npy"))
+            nbytes += columns[name].nbytes
+
+        self.__write_meta(path, {
+            'table': table,
+            'rows': len(columns['datetime']),
+            'nbytes': nbytes,
+            'last_used': time.time()
+        })
+
+        self.evict(keep=path)
+        return self.get(table, start_date, end_date)
+
+    def evict(self, keep: str = None):
+        """Removes the least recently used entries until the cache fits in max_bytes.
+
+        Args:
+            keep (str, optional): The path of an entry which must not be evicted. Defaults to None.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            meta = self.__read_meta(path)
+            if meta is None:
+                continue
+            entries.append((meta['last_used'], meta['nbytes'], path))
+            total += meta['nbytes']
+
+        entries.sort()
+        for _, nbytes, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= nbytes
@@ -1,9 +1,23 @@
 """ This module is responsible for handling the data. """
+from __future__ import annotations
+
+import heapq
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from datetime import datetime
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from events.events import MarketEvent
+from handlers.bars import COLUMNS, ArrayBarFeed, BarFeed, Columns, StreamBarFeed, rows_to_columns
+from handlers.indicators import Indicator
+from handlers.resample import ResampledBarFeed, resample_batches, resample_columns
 
-import mysql.connector
-import pandas as pd
+if TYPE_CHECKING:
+    from handlers.cache import BarCache
+
+MISSING_BAR_POLICIES = ('ffill', 'skip', 'partial')
 
 # Type aliases
 Entry = tuple[str, float, float, float, float, float, int]
@@ -14,7 +28,7 @@ class DataHandler(ABC):
         pass
 
     @abstractmethod
-    def get_latest_bars(self, symbol: str, number_of_bars: int):
+    def get_latest_bars(self, symbol: str, number_of_bars: int) -> Columns:
         pass
 
     @abstractmethod
@@ -26,130 +40,434 @@ class DataHandler(ABC):
         pass
 
     @abstractmethod
-    def get_latest_bar_values(self, symbol: str, val_type: str, number_of_vals: int) -> list:
+    def get_latest_bar_values(self, symbol: str, val_type: str, number_of_vals: int) -> np.ndarray:
         pass
 
     @abstractmethod
     def update(self):
         pass
 
-class MySQLDataHandler(DataHandler):
-    def __init__(self, host: str, user: str, password: str, database: str, tables: dict, start_date:datetime=datetime(2000, 1, 1)):
-        # Initialize variables
-        self.total_data = {}
-        self.date = start_date
-        empty = {
-            'datetime':[],
-            'open':[],
-            'high':[],
-            'low':[],
-            'close':[],
-            'adj_close':[],
-            'volume':[]
-        }
+class FeedDataHandler(DataHandler):
+    """A DataHandler replaying bars from one BarFeed per symbol, held as typed NumPy column arrays.
+    Advancing a bar only moves the feeds with a bar at the new timestamp, and the getters return views
+    of the trailing window instead of building new lists.
 
-        self.data = {symbol:empty.copy() for symbol in tables}
+    Coarser timeframes of a symbol are added with add_timeframe, and are read like any other symbol under
+    a name such as "MNQ@5m". They are aggregated from the base bars during the replay, and a MarketEvent
+    also lists the timeframe when one of its bars closes.
 
-        # Connect to database
-        conn = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
-        )
-        
-        # Create cursor
-        cursor = conn.cursor()
+    Symbols are merged on their bar times, so symbols with different trading hours or missing bars stay
+    aligned. The missing bar policy decides what happens at a timestamp where some symbols have no bar:
+        'ffill': The MarketEvent lists every symbol, those without a bar keep their previous bar as the latest.
+        'skip': Timestamps where any symbol has no bar are passed over without a MarketEvent, and the
+            replay ends as soon as any symbol runs out of data. The bars of the other symbols at those
+            timestamps remain part of their history.
+        'partial': The MarketEvent lists only the symbols with a bar at the timestamp.
 
-        for symbol in tables:
-            table = tables[symbol]
-            query = f"""SELECT entry_time, open_price, high_price, low_price, close_price, adj_price, volume
-                       FROM {table}
-                       WHERE entry_time >= '{start_date.strftime('%Y-%m-%d %H:%M:%S')}'
-                       ORDER BY entry_time ASC"""
-            
-            
-            cursor.execute(query)
-            df = pd.DataFrame(cursor.fetchall())
-            self.total_data[symbol] = df[df[0] >= start_date]
-        
-        cursor.close()
-        conn.close()
+    Attributes:
+        feeds (dict): A dictionary mapping each symbol to the BarFeed holding its bars.
+        missing (str): The missing bar policy, one of MISSING_BAR_POLICIES.
+        symbols (list[str]): The symbols of the data handler.
+        counter (int): The index of the latest timestamp, -1 before the first update.
+        current_time (np.datetime64): The latest timestamp, None before the first update.
+        updated_symbols (list[str]): The symbols with a bar at the latest timestamp.
+        indicators (dict): A dictionary mapping each symbol to its indicators by name.
+        timeframes (dict): A dictionary mapping each symbol to the (name, ResampledBarFeed) pairs of its timeframes.
+        event_pool (EventPool): The pool MarketEvents are taken from, None to allocate new ones.
+        continue_backtest (bool): False once out of data.
+    """
+    def __init__(self, feeds: dict[str, BarFeed], missing: str = 'ffill'):
+        """Constructor method
+
+        Args:
+            feeds (dict[str, BarFeed]): A dictionary mapping each symbol to the BarFeed holding its bars.
+            missing (str, optional): The policy for symbols without a bar at a timestamp, one of MISSING_BAR_POLICIES. Defaults to 'ffill'.
+        """
+        if missing not in MISSING_BAR_POLICIES:
+            raise ValueError(f"Unknown missing bar policy {missing}, expected one of {MISSING_BAR_POLICIES}.")
+
+        self.feeds = feeds
+        self.missing = missing
+        self.symbols = list(feeds)
+        self.feed_list = list(feeds.values())
+
+        # Heap of (next bar time, symbol index) holding every symbol with data left
+        self.heap = [(feed.peek_time(), i) for i, feed in enumerate(self.feed_list) if feed.has_next()]
+        heapq.heapify(self.heap)
 
         self.counter = -1
+        self.current_time = None
+        self.updated_symbols = []
+        self.indicators = {}
+        self.timeframes = {}
+        self.event_pool = None # Set to an EventPool to reuse MarketEvents
         self.continue_backtest = True # Set to false when out of data, or counter > number of trading periods
 
-    def __validate_symbol(self, symbol: str):
-        if symbol not in self.data:
-            raise ValueError(f"Symbol {symbol} not available in data handler.")
-    
+    def _get_feed(self, symbol: str) -> BarFeed:
+        try:
+            return self.feeds[symbol]
+        except KeyError:
+            raise ValueError(f"Symbol {symbol} not available in data handler.") from None
+
+    def full_bars(self) -> dict[str, Columns]:
+        """Returns the full column arrays of every symbol, for consumers working on the whole history at once.
+        Timeframes are not included, as they are aggregated during the replay.
+
+        Returns:
+            dict[str, Columns]: A dictionary mapping each symbol to its column arrays.
+        """
+        bars = {}
+        for symbol in self.symbols:
+            feed = self.feeds[symbol]
+            if not isinstance(feed, ArrayBarFeed):
+                raise ValueError(f"Symbol {symbol} is not loaded in memory, streamed bars have no full arrays.")
+            bars[symbol] = feed.columns
+        return bars
+
+    def add_timeframe(self, symbol: str, timeframe: str, lookback: int = 1000) -> str:
+        """Adds a coarser timeframe of a symbol, aggregated from its bars during the replay. Must be called
+        before the first update.
+
+        Args:
+            symbol (str): The symbol to aggregate.
+            timeframe (str): The timeframe to aggregate to, such as '5m', '1h' or '1d'.
+            lookback (int, optional): The number of aggregated bars guaranteed to remain visible. Defaults to 1000.
+
+        Returns:
+            str: The name the timeframe is read with, such as "MNQ@5m".
+        """
+        self._get_feed(symbol)
+        name = f"{symbol}@{timeframe}"
+        if name not in self.feeds:
+            feed = ResampledBarFeed(timeframe, lookback)
+            self.feeds[name] = feed
+            self.timeframes.setdefault(symbol, []).append((name, feed))
+        return name
+
+    def add_indicator(self, symbol: str, name: str, indicator: Indicator):
+        """Attaches an indicator to a symbol, updated on every new bar of the symbol.
+
+        Args:
+            symbol (str): The symbol the indicator is computed on.
+            name (str): The name the indicator is read back with.
+            indicator (Indicator): The indicator to attach.
+        """
+        self._get_feed(symbol)
+        self.indicators.setdefault(symbol, {})[name] = indicator
+
+    def get_indicator(self, symbol: str, name: str) -> float:
+        """Returns the current value of an indicator attached to a symbol.
+
+        Args:
+            symbol (str): The symbol the indicator is computed on.
+            name (str): The name the indicator was attached with.
+
+        Returns:
+            float: The value of the indicator, None until enough bars have been seen.
+        """
+        try:
+            return self.indicators[symbol][name].value
+        except KeyError:
+            raise ValueError(f"Indicator {name} not attached to symbol {symbol}.") from None
+
+    def get_state(self) -> dict:
+        """Returns the replay position of the data handler, as saved by a checkpoint. The indicators are
+        part of the state, while the bars are only included where a feed cannot read them again.
+
+        Returns:
+            dict: The state of the merge, of every feed, timeframe and indicator.
+        """
+        return {
+            'heap': list(self.heap),
+            'counter': self.counter,
+            'current_time': self.current_time,
+            'updated_symbols': list(self.updated_symbols),
+            'continue_backtest': self.continue_backtest,
+            'feeds': {symbol: feed.get_state() for symbol, feed in self.feeds.items()},
+            'timeframes': {symbol: [(name, feed.timeframe, feed.lookback) for name, feed in timeframes]
+                           for symbol, timeframes in self.timeframes.items()},
+            'indicators': self.indicators
+        }
+
+    def set_state(self, state: dict):
+        """Moves a freshly built data handler over the same bars to a state returned by get_state, adding
+        the timeframes it lacks, so the replay continues from the bar after the saved one.
+
+        Args:
+            state (dict): The state to restore.
+        """
+        for symbol, timeframes in state['timeframes'].items():
+            for _, timeframe, lookback in timeframes:
+                self.add_timeframe(symbol, timeframe, lookback)
+        for symbol, feed_state in state['feeds'].items():
+            self._get_feed(symbol).set_state(feed_state)
+
+        self.heap = list(state['heap'])
+        self.counter = state['counter']
+        self.current_time = state['current_time']
+        self.updated_symbols = list(state['updated_symbols'])
+        self.continue_backtest = state['continue_backtest']
+        self.indicators = state['indicators']
+
     def get_latest_bar(self, symbol: str) -> Entry:
-        self.__validate_symbol(symbol)
-        
+        feed = self._get_feed(symbol)
+
         # Check if data is available or empty
-        if not self.data[symbol]['datetime']:
+        if not len(feed):
             return None
-        
-        return (self.data[symbol]['datetime'][-1],
-                self.data[symbol]['open'][-1],
-                self.data[symbol]['high'][-1],
-                self.data[symbol]['low'][-1],
-                self.data[symbol]['close'][-1],
-                self.data[symbol]['adj_close'][-1],
-                self.data[symbol]['volume'][-1])
-    
-    def get_latest_bars(self, symbol: str, number_of_bars: int = 1) -> list[Entry]:
-        self.__validate_symbol(symbol)
-
-        bars = []
-        number_of_bars = min(number_of_bars, len(self.data[symbol]['datetime']))
-
-        for i in range(len(self.data[symbol]['datetime']) - number_of_bars, len(self.data[symbol]['datetime'])):
-            bars.append((self.data[symbol]['datetime'][i], 
-                         self.data[symbol]['open'][i], 
-                         self.data[symbol]['high'][i], 
-                         self.data[symbol]['low'][i], 
-                         self.data[symbol]['close'][i], 
-                         self.data[symbol]['adj_close'][i], 
-                         self.data[symbol]['volume'][i]))
 
-        return bars
-    
+        return tuple(feed.latest(name) for name in COLUMNS)
+
+    def get_latest_bars(self, symbol: str, number_of_bars: int = 1) -> Columns:
+        """Returns the trailing window of bars for a symbol.
+
+        Args:
+            symbol (str): The symbol to get bars for.
+            number_of_bars (int, optional): The maximum number of bars to return. Defaults to 1.
+
+        Returns:
+            Columns: A dictionary mapping each column name to a view of its trailing window.
+        """
+        return self._get_feed(symbol).bars(number_of_bars)
+
     def get_latest_bar_datetime(self, symbol: str) -> datetime:
-        self.__validate_symbol(symbol)
-        return self.data[symbol]['datetime'][-1]
-    
+        feed = self._get_feed(symbol)
+        if not len(feed):
+            return None
+        return feed.latest('datetime').item()
+
     def get_latest_bar_value(self, symbol: str, val_type: str) -> float:
-        self.__validate_symbol(symbol)
-        return self.data[symbol][val_type][-1]
-    
-    def get_latest_bar_values(self, symbol: str, val_type: str, number_of_vals: int = 1) -> list:
-        self.__validate_symbol(symbol)
-        
-        vals = []
-        number_of_vals = min(number_of_vals, len(self.data[symbol][val_type]))
+        feed = self._get_feed(symbol)
+        if not len(feed):
+            return None
+        return feed.latest(val_type)
 
-        for i in range(len(self.data[symbol][val_type]) - number_of_vals, len(self.data[symbol][val_type])):
-            vals.append(self.data[symbol][val_type][i])
+    def get_latest_bar_values(self, symbol: str, val_type: str, number_of_vals: int = 1) -> np.ndarray:
+        """Returns the trailing window of a single column for a symbol.
 
-        return vals
-    
-    def update(self):
+        Args:
+            symbol (str): The symbol to get values for.
+            val_type (str): The column to read, one of COLUMNS.
+            number_of_vals (int, optional): The maximum number of values to return. Defaults to 1.
+
+        Returns:
+            np.ndarray: A view of the trailing window of the column.
+        """
+        return self._get_feed(symbol).window(val_type, number_of_vals)
+
+    def update(self) -> MarketEvent:
+        """Advances the replay to the next timestamp present in any symbol, merging the symbols on
+        their bar times through a heap so each bar costs O(log n) in the number of symbols. Symbols
+        without a bar at that timestamp are handled according to the missing bar policy.
+
+        Returns:
+            MarketEvent: The MarketEvent for the new timestamp, or None once out of data.
+        """
         if not self.continue_backtest:
+            return None
+
+        heap = self.heap
+        number_of_symbols = len(self.symbols)
+        closed = []
+        while heap:
+            # No timestamp can be complete once a symbol runs out of data
+            if self.missing == 'skip' and len(heap) < number_of_symbols:
+                break
+
+            time = heap[0][0]
+            updated = []
+            while heap and heap[0][0] == time:
+                index = heap[0][1]
+                feed = self.feed_list[index]
+                feed.advance()
+                symbol = self.symbols[index]
+                updated.append(symbol)
+
+                indicators = self.indicators.get(symbol)
+                if indicators:
+                    for indicator in indicators.values():
+                        indicator.update(feed)
+
+                timeframes = self.timeframes.get(symbol)
+                if timeframes:
+                    for name, resampled in timeframes:
+                        if resampled.push(feed):
+                            resampled.advance()
+                            closed.append(name)
+                            for indicator in self.indicators.get(name, {}).values():
+                                indicator.update(resampled)
+
+                if feed.has_next():
+                    heapq.heapreplace(heap, (feed.peek_time(), index))
+                else:
+                    heapq.heappop(heap)
+
+            if self.missing == 'skip' and len(updated) < number_of_symbols:
+                continue
+
+            self.counter += 1
+            self.current_time = time
+            symbols = updated if self.missing == 'partial' else self.symbols
+            if closed:
+                # Timeframes closed at timestamps skipped by the policy are reported with the next event
+                updated = updated + closed
+                symbols = symbols + closed
+            self.updated_symbols = updated
+            make_event = self.event_pool.market_event if self.event_pool else MarketEvent
+            return make_event(time, symbols)
+
+        self.continue_backtest = False
+        return None
+
+class ArrayDataHandler(FeedDataHandler):
+    """A FeedDataHandler replaying bars held fully in memory.
+    """
+    def __init__(self, bars: dict[str, Columns], missing: str = 'ffill'):
+        """Constructor method
+
+        Args:
+            bars (dict[str, Columns]): A dictionary mapping each symbol to its column arrays.
+            missing (str, optional): The policy for symbols without a bar at a timestamp. Defaults to 'ffill'.
+        """
+        super().__init__({symbol: ArrayBarFeed(columns) for symbol, columns in bars.items()}, missing)
+
+def _stream_rows(connection_args: dict, query: str, batch_size: int) -> Iterator[Columns]:
+    """Streams the result of a query in batches through an unbuffered cursor, so rows are only read
+    from the server as they are needed. Each stream uses its own connection, as MySQL allows a single
+    unread result set per connection.
+
+    Args:
+        connection_args (dict): The keyword arguments passed to mysql.connector.connect.
+        query (str): The query to run.
+        batch_size (int): The number of rows to fetch per batch.
+
+    Yields:
+        Columns: The next batch of rows as column arrays.
+    """
+    import mysql.connector
+
+    conn = mysql.connector.connect(**connection_args)
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows_to_columns(rows)
+    finally:
+        cursor.close()
+        conn.close()
+
+class MySQLDataHandler(FeedDataHandler):
+    """A FeedDataHandler loading the history of each symbol from a MySQL table.
+
+    By default every table is read fully into memory before the first bar is replayed. Given a BarCache,
+    the bars are memory-mapped from the cache instead, and only rows newer than the latest cached bar are
+    queried and added to it. In streaming mode, each table is instead read in batches of batch_size rows,
+    and only the trailing lookback bars of each symbol are kept, so memory no longer grows with the length
+    of the history. The cache is not used in streaming mode.
+
+    Given a timeframe, the bars are aggregated as they are loaded, and the cache holds the aggregated bars
+    under the table name followed by the timeframe, such as "mnq@1d".
+    """
+    def __init__(self, host: str, user: str, password: str, database: str, tables: dict, start_date:datetime=datetime(2000, 1, 1),
+                 end_date: datetime = None, streaming: bool = False, batch_size: int = 10000, lookback: int = 1000,
+                 missing: str = 'ffill', cache: BarCache = None, timeframe: str = None):
+        """Constructor method
+
+        Args:
+            host (str): The host of the MySQL server.
+            user (str): The user to connect as.
+            password (str): The password of the user.
+            database (str): The database holding the tables.
+            tables (dict): A dictionary mapping each symbol to the table holding its bars.
+            start_date (datetime, optional): The earliest bar to load. Defaults to datetime(2000, 1, 1).
+            end_date (datetime, optional): Only bars strictly before this date are loaded, None for no limit. Defaults to None.
+            streaming (bool, optional): Whether to stream the tables in batches instead of loading them fully. Defaults to False.
+            batch_size (int, optional): The number of rows fetched per batch in streaming mode. Defaults to 10000.
+            lookback (int, optional): The number of trailing bars kept per symbol in streaming mode. Defaults to 1000.
+            missing (str, optional): The policy for symbols without a bar at a timestamp. Defaults to 'ffill'.
+            cache (BarCache, optional): The on-disk cache to load bars through. Defaults to None.
+            timeframe (str, optional): A timeframe such as '1d' to aggregate the bars to before the replay, so
+                only the aggregated bars are replayed and cached. Defaults to None, replaying the stored bars.
+        """
+        self.date = start_date
+        self.end_date = end_date
+        connection_args = {
+            'host': host,
+            'user': user,
+            'password': password,
+            'database': database
+        }
+
+        if streaming:
+            feeds = {}
+            for symbol, table in tables.items():
+                batches = _stream_rows(connection_args, self._query(table), batch_size)
+                if timeframe:
+                    batches = resample_batches(batches, timeframe)
+                feeds[symbol] = StreamBarFeed(batches, lookback)
+            super().__init__(feeds, missing)
             return
 
-        self.counter += 1
-
-        for symbol, dataframe in self.total_data.items():
-            if self.counter < len(self.total_data[symbol]):
-                self.data[symbol]['datetime'].append(dataframe.iloc[self.counter, 0])
-                self.data[symbol]['open'].append(dataframe.iloc[self.counter, 1])
-                self.data[symbol]['high'].append(dataframe.iloc[self.counter, 2])
-                self.data[symbol]['low'].append(dataframe.iloc[self.counter, 3])
-                self.data[symbol]['close'].append(dataframe.iloc[self.counter, 4])
-                self.data[symbol]['adj_close'].append(dataframe.iloc[self.counter, 5])
-                self.data[symbol]['volume'].append(dataframe.iloc[self.counter, 6])
+        import mysql.connector
+
+        feeds = {}
+
+        # Connect to database
+        conn = mysql.connector.connect(**connection_args)
+        
+        # Create cursor
+        cursor = conn.cursor()
+
+        for symbol in tables:
+            table = tables[symbol]
+            key = f"{table}@{timeframe}" if timeframe else table
+            cached = cache.get(key, start_date, end_date) if cache else None
+
+            if cached is None:
+                cursor.execute(self._query(table))
+                columns = rows_to_columns(cursor.fetchall())
+                if timeframe:
+                    columns = resample_columns(columns, timeframe)
+                if cache:
+                    columns = cache.put(key, start_date, end_date, columns)
+            elif not timeframe:
+                # Only fetch the rows newer than the cached ones
+                after = cached['datetime'][-1].item() if len(cached['datetime']) else None
+                cursor.execute(self._query(table, after))
+                delta = rows_to_columns(cursor.fetchall())
+                columns = cached
+                if len(delta['datetime']):
+                    columns = cache.put(key, start_date, end_date,
+                                        {name: np.concatenate((cached[name], delta[name])) for name in COLUMNS})
             else:
-                self.continue_backtest = False
-                return
-                
\ No newline at end of file
+                # The last cached period may have been incomplete, so fetch it again with the newer rows
+                after = (cached['datetime'][-1] - np.timedelta64(1, 'us')).item() if len(cached['datetime']) else None
+                cursor.execute(self._query(table, after))
+                delta = resample_columns(rows_to_columns(cursor.fetchall()), timeframe)
+                columns = cached
+                kept = max(len(cached['datetime']) - 1, 0)
+                if any(not np.array_equal(cached[name][kept:], delta[name]) for name in COLUMNS):
+                    columns = cache.put(key, start_date, end_date,
+                                        {name: np.concatenate((cached[name][:kept], delta[name])) for name in COLUMNS})
+
+            feeds[symbol] = ArrayBarFeed(columns)
+        
+        cursor.close()
+        conn.close()
+
+        super().__init__(feeds, missing)
+
+    def _query(self, table: str, after: datetime = None) -> str:
+        conditions = [f"entry_time >= '{self.date.strftime('%Y-%m-%d %H:%M:%S')}'"]
+        if after is not None:
+            conditions.append(f"entry_time > '{after.strftime('%Y-%m-%d %H:%M:%S.%f')}'")
+        if self.end_date is not None:
+            conditions.append(f"entry_time < '{self.end_date.strftime('%Y-%m-%d %H:%M:%S')}'")
+
+        return f"""SELECT entry_time, open_price, high_price, low_price, close_price, adj_price, volume
+                   FROM {table}
+                   WHERE {' AND '.join(conditions)}
+                   ORDER BY entry_time ASC"""
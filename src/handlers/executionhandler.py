@@ -1,5 +1,16 @@
+from __future__ import annotations
+
+import heapq
+from collections import deque
+from typing import TYPE_CHECKING
+
 from generators.event_queue import EventQueue
-from events.events import Event, OrderEvent, FillEvent
+from events.events import Event, EventType, MarketEvent, OrderEvent, FillEvent
+
+if TYPE_CHECKING:
+    from handlers.datahandler import DataHandler
+
+ORDER_TYPES = ('market', 'limit', 'stop')
 
 class ExecutionHandler(object):
     def __init__(self, event_queue: EventQueue, commission: float, fill_cost: float):
@@ -7,18 +18,309 @@ class ExecutionHandler(object):
         self.fill_cost = fill_cost
 
         self.event_queue = event_queue
+        self.event_pool = None # Set to an EventPool to reuse FillEvents
+
+    def update(self, market_event: MarketEvent):
+        """Updates the execution handler on a new bar. Called upon a new MarketEvent, before the portfolio
+        and strategy are updated.
+
+        Args:
+            market_event (MarketEvent): The MarketEvent being processed.
+        """
+        pass
 
     def execute_order(self, order_event: Event):
-        if order_event.type != 'ORDER':
+        if order_event.type != EventType.ORDER:
             return
 
-        fill_event = FillEvent(
+        make_fill = self.event_pool.fill_event if self.event_pool else FillEvent
+        fill_event = make_fill(
             order_event.symbol,
-            order_event.quantity,
-            order_event.direction,
-            order_event.entry_time,
+            order_event.timestamp,
+            abs(order_event.quantity),
+            'BUY' if order_event.quantity > 0 else 'SELL',
             self.fill_cost,
             self.commission
         )
 
-        self.event_queue.put(fill_event)
\ No newline at end of file
+        self.event_queue.put(fill_event)
+
+class RestingOrder(object):
+    """The part of an order left to fill in a SimulatedExecutionHandler.
+
+    Attributes:
+        order (OrderEvent): The order.
+        remaining (int): The signed quantity left to fill, positive for a buy and negative for a sell.
+        active_period (int): The first period the order can be matched in.
+    """
+    __slots__ = ('order', 'remaining', 'active_period')
+
+    def __init__(self, order: OrderEvent, active_period: int):
+        self.order = order
+        self.remaining = order.quantity
+        self.active_period = active_period
+
+class OrderBook(object):
+    """The resting orders of a single symbol, with limit and stop orders kept in heaps of price levels so
+    the orders triggered by a bar are popped in price priority without scanning the others. Orders at the
+    same price keep their arrival order.
+
+    Attributes:
+        market (deque[RestingOrder]): The market orders waiting for volume, in arrival order.
+        buy_limits (list): A heap of (-price, sequence, RestingOrder), highest price first.
+        sell_limits (list): A heap of (price, sequence, RestingOrder), lowest price first.
+        buy_stops (list): A heap of (price, sequence, RestingOrder), lowest price first.
+        sell_stops (list): A heap of (-price, sequence, RestingOrder), highest price first.
+        last_time: The time of the latest bar matched against the book, or seen by the latest order sent to it.
+    """
+    def __init__(self):
+        self.market = deque()
+        self.buy_limits = []
+        self.sell_limits = []
+        self.buy_stops = []
+        self.sell_stops = []
+        self.last_time = None
+
+    def add(self, resting: RestingOrder, sequence: int):
+        order = resting.order
+        if order.order_type == 'market':
+            self.market.append(resting)
+        elif order.order_type == 'limit':
+            if resting.remaining > 0:
+                heapq.heappush(self.buy_limits, (-order.price, sequence, resting))
+            else:
+                heapq.heappush(self.sell_limits, (order.price, sequence, resting))
+        elif resting.remaining > 0:
+            heapq.heappush(self.buy_stops, (order.price, sequence, resting))
+        else:
+            heapq.heappush(self.sell_stops, (-order.price, sequence, resting))
+
+    def __len__(self) -> int:
+        return len(self.market) + len(self.buy_limits) + len(self.sell_limits) + len(self.buy_stops) + len(self.sell_stops)
+
+class SimulatedExecutionHandler(ExecutionHandler):
+    """An ExecutionHandler simulating an exchange, with market, limit and stop orders, slippage, latency
+    and fills capped by the traded volume.
+
+    Orders reach the book latency bars after being sent, and are matched against each new bar of their
+    symbol. Market orders sent without latency fill at once at the latest close. Otherwise:
+        Market orders fill at the open of the bar.
+        Limit orders fill when the bar trades through their price, at their price or at the open if better.
+        Stop orders become market orders when the bar trades through their price, and fill at their price
+            or at the open if worse.
+    Market and stop fills pay slippage as a fraction of the price. With a volume limit, at most that
+    fraction of each bar's volume is filled per symbol, in the order market, stop then limit orders, the
+    rest of each order staying in the book for the following bars.
+
+    Attributes:
+        data_handler (DataHandler): The data handler providing the bars orders are matched against.
+        slippage (float): The price paid away on market and stop fills, as a fraction of the price.
+        latency (int): The number of bars an order takes to reach the book.
+        volume_limit (float): The fraction of each bar's volume that can be filled, None for no limit.
+        books (dict[str, OrderBook]): The resting orders of each symbol.
+        period (int): The number of bars processed so far.
+    """
+    def __init__(self, data_handler: DataHandler, event_queue: EventQueue, commission: float = 0, fill_cost: float = 0.87,
+                 slippage: float = 0, latency: int = 0, volume_limit: float = None):
+        """Constructor method
+
+        Args:
+            data_handler (DataHandler): The data handler providing the bars orders are matched against.
+            event_queue (EventQueue): The queue FillEvents are put on.
+            commission (float, optional): The commission as a fraction of the traded value. Defaults to 0.
+            fill_cost (float, optional): The flat fee paid per contract traded. Defaults to 0.87.
+            slippage (float, optional): The price paid away on market and stop fills, as a fraction of the price. Defaults to 0.
+            latency (int, optional): The number of bars an order takes to reach the book. Defaults to 0.
+            volume_limit (float, optional): The fraction of each bar's volume that can be filled, None for no limit. Defaults to None.
+        """
+        super().__init__(event_queue, commission, fill_cost)
+        self.data_handler = data_handler
+        self.slippage = slippage
+        self.latency = latency
+        self.volume_limit = volume_limit
+
+        self.books = {}
+        self.period = 0
+        self.sequence = 0
+        self.incoming = deque()
+        self.used_volume = {}
+
+    def __book(self, symbol: str) -> OrderBook:
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook()
+        return book
+
+    def __available(self, symbol: str) -> float:
+        """Returns the volume left to fill for a symbol in the current bar.
+        """
+        if self.volume_limit is None:
+            return float('inf')
+        volume = self.data_handler.get_latest_bar_value(symbol, 'volume')
+        return int(self.volume_limit * volume) - self.used_volume.get(symbol, 0)
+
+    def __fill(self, resting: RestingOrder, price: float, available: float, timestamp) -> float:
+        """Fills as much of an order as the available volume allows.
+
+        Returns:
+            float: The volume left after the fill.
+        """
+        quantity = min(abs(resting.remaining), available)
+        if quantity <= 0:
+            return available
+
+        order = resting.order
+        if order.order_type != 'limit':
+            price = price * (1 + self.slippage) if resting.remaining > 0 else price * (1 - self.slippage)
+
+        make_fill = self.event_pool.fill_event if self.event_pool else FillEvent
+        self.event_queue.put(make_fill(
+            order.symbol,
+            timestamp,
+            quantity,
+            'BUY' if resting.remaining > 0 else 'SELL',
+            self.fill_cost,
+            self.commission,
+            price
+        ))
+
+        resting.remaining -= quantity if resting.remaining > 0 else -quantity
+        if self.volume_limit is not None:
+            self.used_volume[order.symbol] = self.used_volume.get(order.symbol, 0) + quantity
+        return available - quantity
+
+    def execute_order(self, order_event: Event):
+        if order_event.type != EventType.ORDER:
+            return
+
+        if order_event.order_type not in ORDER_TYPES:
+            raise ValueError(f"Unknown order type {order_event.order_type}, expected one of {ORDER_TYPES}.")
+        if order_event.order_type != 'market' and order_event.price is None:
+            raise ValueError(f"A {order_event.order_type} order needs a price.")
+        if order_event.quantity == 0:
+            return
+
+        # The order was sent after its symbol's latest bar, so that bar must never be matched against it,
+        # even when the next periods forward fill it
+        symbol = order_event.symbol
+        book = self.__book(symbol)
+        book.last_time = self.data_handler.get_latest_bar_datetime(symbol)
+
+        if order_event.order_type == 'market' and self.latency == 0:
+            resting = RestingOrder(order_event, self.period)
+            close = self.data_handler.get_latest_bar_value(symbol, 'close')
+            self.__fill(resting, close, self.__available(symbol), order_event.timestamp)
+            if resting.remaining:
+                # The rest fills at the open of the following bars
+                resting.active_period = self.period + 1
+                book.add(resting, self.sequence)
+                self.sequence += 1
+            return
+
+        # Orders sent during a bar can only be matched from the next bar on
+        self.incoming.append(RestingOrder(order_event, self.period + max(self.latency, 1)))
+
+    def update(self, market_event: MarketEvent):
+        """Matches the resting orders against the new bar of each symbol named by the event.
+
+        Args:
+            market_event (MarketEvent): The MarketEvent being processed.
+        """
+        self.period += 1
+        self.used_volume.clear()
+
+        incoming = self.incoming
+        while incoming and incoming[0].active_period <= self.period:
+            resting = incoming.popleft()
+            self.__book(resting.order.symbol).add(resting, self.sequence)
+            self.sequence += 1
+
+        symbols = market_event.symbols if market_event.symbols is not None else list(self.books)
+        for symbol in symbols:
+            book = self.books.get(symbol)
+            if not book:
+                continue
+
+            # Symbols without a new bar are listed by forward filling data handlers
+            bar_time = self.data_handler.get_latest_bar_datetime(symbol)
+            if bar_time is None or bar_time == book.last_time:
+                continue
+            book.last_time = bar_time
+
+            self.__match(book, symbol, market_event.timestamp)
+
+    def __match(self, book: OrderBook, symbol: str, timestamp):
+        """Matches the resting orders of a symbol against its latest bar.
+        """
+        data_handler = self.data_handler
+        open_price = data_handler.get_latest_bar_value(symbol, 'open')
+        high = data_handler.get_latest_bar_value(symbol, 'high')
+        low = data_handler.get_latest_bar_value(symbol, 'low')
+        available = self.__available(symbol)
+
+        # Market orders, in arrival order
+        market = book.market
+        while market and available > 0:
+            resting = market[0]
+            available = self.__fill(resting, open_price, available, timestamp)
+            if resting.remaining:
+                break
+            market.popleft()
+
+        # Triggered stop orders become market orders at their stop price, or the open if it gapped through
+        triggered = []
+        while book.buy_stops and book.buy_stops[0][0] <= high:
+            _, sequence, resting = heapq.heappop(book.buy_stops)
+            triggered.append((sequence, resting, max(open_price, resting.order.price)))
+        while book.sell_stops and -book.sell_stops[0][0] >= low:
+            _, sequence, resting = heapq.heappop(book.sell_stops)
+            triggered.append((sequence, resting, min(open_price, resting.order.price)))
+
+        for sequence, resting, price in sorted(triggered, key=lambda item: item[0]):
+            available = self.__fill(resting, price, available, timestamp)
+            if resting.remaining:
+                market.append(resting)
+
+        # Limit orders the bar traded through, best price first
+        unfilled = []
+        while book.buy_limits and -book.buy_limits[0][0] >= low and available > 0:
+            entry = heapq.heappop(book.buy_limits)
+            resting = entry[2]
+            available = self.__fill(resting, min(open_price, resting.order.price), available, timestamp)
+            if resting.remaining:
+                unfilled.append((book.buy_limits, entry))
+        while book.sell_limits and book.sell_limits[0][0] <= high and available > 0:
+            entry = heapq.heappop(book.sell_limits)
+            resting = entry[2]
+            available = self.__fill(resting, max(open_price, resting.order.price), available, timestamp)
+            if resting.remaining:
+                unfilled.append((book.sell_limits, entry))
+
+        for heap, entry in unfilled:
+            heapq.heappush(heap, entry)
+
+    def cancel_orders(self, symbol: str = None):
+        """Cancels the resting orders of a symbol, or of every symbol.
+
+        Args:
+            symbol (str, optional): The symbol to cancel the orders of. Defaults to None, cancelling every order.
+        """
+        if symbol is None:
+            self.books.clear()
+            self.incoming.clear()
+            return
+
+        self.books.pop(symbol, None)
+        self.incoming = deque(resting for resting in self.incoming if resting.order.symbol != symbol)
+
+    def open_orders(self, symbol: str) -> int:
+        """Returns the number of resting orders of a symbol, not counting orders yet to reach the book.
+
+        Args:
+            symbol (str): The symbol to count the orders of.
+
+        Returns:
+            int: The number of resting orders.
+        """
+        book = self.books.get(symbol)
+        return len(book) if book else 0
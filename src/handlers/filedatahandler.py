@@ -0,0 +1,146 @@
+""" This module holds the data handlers reading bars from files instead of a database. """
+from abc import abstractmethod
+from collections.abc import Iterator
+from datetime import datetime
+
+import numpy as np
+
+from handlers.bars import COLUMNS, DTYPES, Columns, StreamBarFeed, read_csv_rows, rows_to_columns
+from handlers.datahandler import FeedDataHandler
+from handlers.resample import resample_batches
+
+def _select_dates(columns: Columns, start_date: datetime, end_date: datetime) -> Columns:
+    """Keeps the bars at or after start_date and strictly before end_date.
+
+    Args:
+        columns (Columns): The bars to filter.
+        start_date (datetime): The earliest bar to keep, None for no limit.
+        end_date (datetime): Only bars strictly before this date are kept, None for no limit.
+
+    Returns:
+        Columns: The filtered bars, the same arrays if no bar was dropped.
+    """
+    times = columns['datetime']
+    keep = np.ones(len(times), dtype=bool)
+    if start_date is not None:
+        keep &= times >= np.datetime64(start_date, 'us')
+    if end_date is not None:
+        keep &= times < np.datetime64(end_date, 'us')
+
+    if keep.all():
+        return columns
+    return {name: values[keep] for name, values in columns.items()}
+
+def _csv_batches(path: str, batch_size: int) -> Iterator[Columns]:
+    """Reads a CSV file in batches of rows laid out as an Entry, skipping a header row if present. Any
+    other row which cannot be parsed raises a ValueError naming the file and line.
+
+    Args:
+        path (str): The path of the CSV file.
+        batch_size (int): The number of rows per batch.
+
+    Yields:
+        Columns: The next batch of rows as column arrays.
+    """
+    rows = []
+    for row in read_csv_rows(path):
+        rows.append(row)
+        if len(rows) == batch_size:
+            yield rows_to_columns(rows)
+            rows = []
+    if rows:
+        yield rows_to_columns(rows)
+
+def _parquet_batches(path: str, batch_size: int) -> Iterator[Columns]:
+    """Reads a Parquet file in record batches through a memory map, taking the first seven columns of the
+    file as an Entry.
+
+    Args:
+        path (str): The path of the Parquet file.
+        batch_size (int): The maximum number of rows per batch.
+
+    Yields:
+        Columns: The next batch of rows as column arrays.
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    names = parquet_file.schema_arrow.names[:len(COLUMNS)]
+    if len(names) < len(COLUMNS):
+        raise ValueError(f"Parquet file {path} has {len(names)} columns, expected {len(COLUMNS)}.")
+
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=names):
+        yield {name: np.asarray(batch.column(i).to_numpy(zero_copy_only=False)).astype(DTYPES[name], copy=False)
+               for i, name in enumerate(COLUMNS)}
+
+class FileDataHandler(FeedDataHandler):
+    """A base class for FeedDataHandlers reading the history of each symbol from a file, with the columns
+    of an Entry in order. Files are read lazily in batches of batch_size rows, and only the trailing
+    lookback bars of each symbol are kept, so memory does not grow with the length of the history.
+    Files must be sorted by time. Given a timeframe, the bars are aggregated as they are read, so only the
+    aggregated bars are replayed.
+    """
+    def __init__(self, files: dict[str, str], start_date: datetime = None, end_date: datetime = None,
+                 batch_size: int = 10000, lookback: int = 1000, missing: str = 'ffill', timeframe: str = None):
+        """Constructor method
+
+        Args:
+            files (dict[str, str]): A dictionary mapping each symbol to the path of the file holding its bars.
+            start_date (datetime, optional): The earliest bar to load, None for no limit. Defaults to None.
+            end_date (datetime, optional): Only bars strictly before this date are loaded, None for no limit. Defaults to None.
+            batch_size (int, optional): The number of rows read per batch. Defaults to 10000.
+            lookback (int, optional): The number of trailing bars kept per symbol. Defaults to 1000.
+            missing (str, optional): The policy for symbols without a bar at a timestamp. Defaults to 'ffill'.
+            timeframe (str, optional): A timeframe such as '1d' to aggregate the bars to, None to replay the stored bars. Defaults to None.
+        """
+        self.date = start_date
+        self.end_date = end_date
+        self.files = files
+        self.timeframe = timeframe
+
+        feeds = {}
+        for symbol, path in files.items():
+            batches = self.__select(self._read_batches(path, batch_size))
+            if timeframe:
+                batches = resample_batches(batches, timeframe)
+            feeds[symbol] = StreamBarFeed(batches, lookback)
+        super().__init__(feeds, missing)
+
+    def __select(self, batches: Iterator[Columns]) -> Iterator[Columns]:
+        if self.date is None and self.end_date is None:
+            yield from batches
+            return
+
+        for batch in batches:
+            yield _select_dates(batch, self.date, self.end_date)
+
+            # Files are sorted, so the rest of the file is past the end date
+            if self.end_date is not None and len(batch['datetime']) and batch['datetime'][-1] >= np.datetime64(self.end_date, 'us'):
+                return
+
+    @abstractmethod
+    def _read_batches(self, path: str, batch_size: int) -> Iterator[Columns]:
+        """Reads a file in batches.
+
+        Args:
+            path (str): The path of the file.
+            batch_size (int): The number of rows per batch.
+
+        Yields:
+            Columns: The next batch of rows as column arrays.
+        """
+        pass
+
+class CSVDataHandler(FileDataHandler):
+    """A FileDataHandler reading CSV files with the columns entry_time, open, high, low, close, adj_close and
+    volume, and an optional header row, as written for the scripts/add-new-data.py CSVSource.
+    """
+    def _read_batches(self, path: str, batch_size: int) -> Iterator[Columns]:
+        return _csv_batches(path, batch_size)
+
+class ParquetDataHandler(FileDataHandler):
+    """A FileDataHandler reading Parquet files through a memory map, one record batch at a time, taking the
+    first seven columns of each file as an Entry. Requires pyarrow.
+    """
+    def _read_batches(self, path: str, batch_size: int) -> Iterator[Columns]:
+        return _parquet_batches(path, batch_size)
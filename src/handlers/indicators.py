@@ -0,0 +1,275 @@
+""" This module holds incremental indicators, updated by the data handler in O(1) on every new bar. """
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+
+from handlers.bars import BarFeed
+
+class RingBuffer(object):
+    """A fixed-size ring buffer of floats, overwriting its oldest value once full.
+
+    Attributes:
+        size (int): The capacity of the buffer.
+        count (int): The number of values held, at most size.
+    """
+    def __init__(self, size: int):
+        """Constructor method
+
+        Args:
+            size (int): The capacity of the buffer.
+        """
+        if size < 1:
+            raise ValueError("Ring buffer size must be at least 1.")
+
+        self.size = size
+        self.values = [0.0] * size
+        self.position = 0
+        self.count = 0
+
+    def append(self, value: float) -> float:
+        """Adds a value, evicting the oldest one if the buffer is full.
+
+        Args:
+            value (float): The value to add.
+
+        Returns:
+            float: The evicted value, None if the buffer was not full.
+        """
+        evicted = self.values[self.position] if self.count == self.size else None
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        return evicted
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    @property
+    def wrapped(self) -> bool:
+        """True right after the oldest slot has been overwritten by a full cycle of values."""
+        return self.full and self.position == 0
+
+    def __len__(self) -> int:
+        return self.count
+
+class Indicator(ABC):
+    """A base class for indicators. Indicators keep fixed-size state, so each update costs O(1) however
+    long their period, and strategies read the current value instead of recomputing it from a window.
+
+    Attributes:
+        field (str): The column the indicator is computed on.
+        value (float): The current value of the indicator, None until enough bars have been seen.
+    """
+    def __init__(self, field: str = 'close'):
+        """Constructor method
+
+        Args:
+            field (str, optional): The column the indicator is computed on. Defaults to 'close'.
+        """
+        self.field = field
+        self.value = None
+
+    def update(self, feed: BarFeed):
+        """Updates the indicator with the latest bar of a feed. Called by the data handler on every new bar.
+
+        Args:
+            feed (BarFeed): The feed of the symbol the indicator is attached to.
+        """
+        self.push(float(feed.latest(self.field)))
+
+    @abstractmethod
+    def push(self, value: float):
+        pass
+
+class SMA(Indicator):
+    """A simple moving average over the last period values, kept as a running sum. The sum is recomputed
+    exactly once per period to stop rounding errors from accumulating.
+    """
+    def __init__(self, period: int, field: str = 'close'):
+        super().__init__(field)
+        self.buffer = RingBuffer(period)
+        self.total = 0.0
+
+    def push(self, value: float):
+        evicted = self.buffer.append(value)
+        self.total += value - (evicted or 0.0)
+        if self.buffer.wrapped:
+            self.total = math.fsum(self.buffer.values)
+
+        if self.buffer.full:
+            self.value = self.total / self.buffer.size
+
+class EMA(Indicator):
+    """An exponential moving average with smoothing 2 / (period + 1), seeded with the simple average of the
+    first period values.
+    """
+    def __init__(self, period: int, field: str = 'close'):
+        super().__init__(field)
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def push(self, value: float):
+        if self.count < self.period:
+            self.count += 1
+            self.total += value
+            if self.count == self.period:
+                self.value = self.total / self.period
+            return
+
+        self.value += self.alpha * (value - self.value)
+
+class RollingStd(Indicator):
+    """The sample standard deviation of the last period values, kept as running sums of the values and of
+    their squares, recomputed exactly once per period.
+    """
+    def __init__(self, period: int, field: str = 'close'):
+        if period < 2:
+            raise ValueError("Standard deviation period must be at least 2.")
+
+        super().__init__(field)
+        self.buffer = RingBuffer(period)
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.mean = None
+
+    def push(self, value: float):
+        evicted = self.buffer.append(value)
+        if evicted is None:
+            evicted = 0.0
+        self.total += value - evicted
+        self.total_squares += value * value - evicted * evicted
+        if self.buffer.wrapped:
+            self.total = math.fsum(self.buffer.values)
+            self.total_squares = math.fsum(x * x for x in self.buffer.values)
+
+        if self.buffer.full:
+            size = self.buffer.size
+            self.mean = self.total / size
+            variance = (self.total_squares - size * self.mean * self.mean) / (size - 1)
+            self.value = math.sqrt(max(variance, 0.0))
+
+class ZScore(RollingStd):
+    """The number of standard deviations the latest value lies from the mean of the last period values.
+    """
+    def push(self, value: float):
+        super().push(value)
+        if self.value is not None:
+            std = self.value
+            self.value = (value - self.mean) / std if std else 0.0
+
+class RollingMax(Indicator):
+    """The maximum of the last period values, kept with a monotonic deque so each update is amortized O(1).
+    """
+    def __init__(self, period: int, field: str = 'high'):
+        super().__init__(field)
+        self.period = period
+        self.window = deque()
+        self.count = 0
+
+    def _dominates(self, old: float, new: float) -> bool:
+        return old <= new
+
+    def push(self, value: float):
+        window = self.window
+        while window and self._dominates(window[-1][1], value):
+            window.pop()
+        window.append((self.count, value))
+
+        if window[0][0] <= self.count - self.period:
+            window.popleft()
+
+        self.count += 1
+        if self.count >= self.period:
+            self.value = window[0][1]
+
+class RollingMin(RollingMax):
+    """The minimum of the last period values, kept with a monotonic deque so each update is amortized O(1).
+    """
+    def __init__(self, period: int, field: str = 'low'):
+        super().__init__(period, field)
+
+    def _dominates(self, old: float, new: float) -> bool:
+        return old >= new
+
+class VWAP(Indicator):
+    """The volume weighted average of the typical price (high + low + close) / 3, over the last period
+    bars, or since the first bar if period is None.
+    """
+    def __init__(self, period: int = None):
+        super().__init__('close')
+        self.prices = RingBuffer(period) if period else None
+        self.volumes = RingBuffer(period) if period else None
+        self.total = 0.0
+        self.total_volume = 0.0
+
+    def update(self, feed: BarFeed):
+        price = (float(feed.latest('high')) + float(feed.latest('low')) + float(feed.latest('close'))) / 3
+        self.push_bar(price, float(feed.latest('volume')))
+
+    def push(self, value: float):
+        self.push_bar(value, 1.0)
+
+    def push_bar(self, price: float, volume: float):
+        """Adds a bar to the average.
+
+        Args:
+            price (float): The typical price of the bar.
+            volume (float): The volume of the bar.
+        """
+        self.total += price * volume
+        self.total_volume += volume
+
+        if self.prices is not None:
+            evicted_price = self.prices.append(price * volume)
+            evicted_volume = self.volumes.append(volume)
+            if evicted_price is not None:
+                self.total -= evicted_price
+                self.total_volume -= evicted_volume
+            if self.prices.wrapped:
+                self.total = math.fsum(self.prices.values)
+                self.total_volume = math.fsum(self.volumes.values)
+
+        if self.total_volume > 0:
+            self.value = self.total / self.total_volume
+
+class ATR(Indicator):
+    """The average true range, with Wilder smoothing, seeded with the simple average of the first period
+    true ranges.
+    """
+    def __init__(self, period: int = 14):
+        super().__init__('close')
+        self.period = period
+        self.previous_close = None
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, feed: BarFeed):
+        self.push_bar(float(feed.latest('high')), float(feed.latest('low')), float(feed.latest('close')))
+
+    def push(self, value: float):
+        self.push_bar(value, value, value)
+
+    def push_bar(self, high: float, low: float, close: float):
+        """Adds a bar to the average.
+
+        Args:
+            high (float): The high of the bar.
+            low (float): The low of the bar.
+            close (float): The close of the bar.
+        """
+        true_range = high - low
+        if self.previous_close is not None:
+            true_range = max(true_range, abs(high - self.previous_close), abs(low - self.previous_close))
+        self.previous_close = close
+
+        if self.count < self.period:
+            self.count += 1
+            self.total += true_range
+            if self.count == self.period:
+                self.value = self.total / self.period
+            return
+
+        self.value += (true_range - self.value) / self.period
@@ -0,0 +1,165 @@
+""" This module aggregates bars into coarser timeframes, either incrementally during the replay or over full histories. """
+import re
+from collections.abc import Iterator
+
+import numpy as np
+
+from handlers.bars import COLUMNS, DTYPES, BarFeed, Columns, TrailingBarFeed, empty_columns
+
+TIMEFRAME_UNITS = {'s': 's', 'm': 'm', 'h': 'h', 'd': 'D'}
+
+def parse_timeframe(timeframe: str) -> int:
+    """Parses a timeframe such as '5m', '1h' or '1d'.
+
+    Args:
+        timeframe (str): A number followed by one of the units s, m, h or d.
+
+    Returns:
+        int: The length of the timeframe in microseconds, the resolution of bar times.
+    """
+    match = re.fullmatch(r'(\d+)([smhd])', timeframe)
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(f"Unknown timeframe {timeframe}, expected a number followed by one of {tuple(TIMEFRAME_UNITS)}.")
+
+    step = np.timedelta64(int(match.group(1)), TIMEFRAME_UNITS[match.group(2)])
+    return int(step / np.timedelta64(1, 'us'))
+
+def resample_columns(columns: Columns, timeframe: str) -> Columns:
+    """Aggregates a full history of bars into a coarser timeframe. Each bar is labelled with the start of
+    its period, and takes the first open, the highest high, the lowest low, the last close and adjusted
+    close and the total volume of the bars in the period. Periods without bars are left out.
+
+    Args:
+        columns (Columns): The bars to aggregate, sorted by time.
+        timeframe (str): The timeframe to aggregate to, such as '5m', '1h' or '1d'.
+
+    Returns:
+        Columns: The aggregated bars.
+    """
+    step = parse_timeframe(timeframe)
+    times = columns['datetime'].astype(np.int64)
+    if not len(times):
+        return empty_columns()
+
+    buckets = times // step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+
+    return {
+        'datetime': (buckets[starts] * step).astype(DTYPES['datetime']),
+        'open': np.asarray(columns['open'])[starts],
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'close': np.asarray(columns['close'])[ends],
+        'adj_close': np.asarray(columns['adj_close'])[ends],
+        'volume': np.add.reduceat(columns['volume'], starts)
+    }
+
+def resample_batches(batches: Iterator[Columns], timeframe: str) -> Iterator[Columns]:
+    """Aggregates a stream of batches into a coarser timeframe, holding back the bars of the last period
+    of each batch until the period is known to be complete.
+
+    Args:
+        batches (Iterator[Columns]): The bars to aggregate, yielded as column arrays in time order.
+        timeframe (str): The timeframe to aggregate to, such as '5m', '1h' or '1d'.
+
+    Yields:
+        Columns: The next batch of aggregated bars.
+    """
+    step = parse_timeframe(timeframe)
+    carry = empty_columns()
+    for batch in batches:
+        if not len(batch['datetime']):
+            continue
+
+        columns = {name: np.concatenate((carry[name], batch[name])) for name in COLUMNS}
+        buckets = columns['datetime'].astype(np.int64) // step
+        last = np.searchsorted(buckets, buckets[-1])
+        carry = {name: values[last:] for name, values in columns.items()}
+        yield resample_columns({name: values[:last] for name, values in columns.items()}, timeframe)
+
+    if len(carry['datetime']):
+        yield resample_columns(carry, timeframe)
+
+class ResampledBarFeed(TrailingBarFeed):
+    """A BarFeed aggregating the bars of a base feed into a coarser timeframe as they are revealed, with
+    the same roll-up rules as resample_columns.
+
+    Base bars are pushed one at a time into a pending bar, which is revealed by advance() once its period
+    is complete. A period is complete when the next base bar falls in a later period, or when the base
+    feed runs out of data, so each aggregated bar is revealed with the last base bar it contains.
+
+    Attributes:
+        timeframe (str): The timeframe bars are aggregated to.
+        step (int): The length of the timeframe in microseconds.
+        lookback (int): The number of completed bars guaranteed to remain visible.
+        pending (list): The bar being aggregated as [period, open, high, low, close, adj_close, volume], None if empty.
+    """
+    def __init__(self, timeframe: str, lookback: int = 1000):
+        """Constructor method
+
+        Args:
+            timeframe (str): The timeframe to aggregate to, such as '5m', '1h' or '1d'.
+            lookback (int, optional): The number of completed bars guaranteed to remain visible. Defaults to 1000.
+        """
+        super().__init__(lookback)
+        self.timeframe = timeframe
+        self.step = parse_timeframe(timeframe)
+        self.pending = None
+
+    def push(self, feed: BarFeed) -> bool:
+        """Adds the latest bar of the base feed to the pending bar.
+
+        Args:
+            feed (BarFeed): The base feed, just advanced.
+
+        Returns:
+            bool: True if the pending bar is complete and should be revealed.
+        """
+        period = int(feed.latest('datetime').astype(np.int64)) // self.step
+        high = float(feed.latest('high'))
+        low = float(feed.latest('low'))
+        close = float(feed.latest('close'))
+        adj_close = float(feed.latest('adj_close'))
+        volume = int(feed.latest('volume'))
+
+        pending = self.pending
+        if pending is None or pending[0] != period:
+            # Reveal a complete bar the caller did not advance
+            if pending is not None:
+                self.advance()
+            self.pending = [period, float(feed.latest('open')), high, low, close, adj_close, volume]
+        else:
+            if high > pending[2]:
+                pending[2] = high
+            if low < pending[3]:
+                pending[3] = low
+            pending[4] = close
+            pending[5] = adj_close
+            pending[6] += volume
+
+        if not feed.has_next():
+            return True
+        return int(feed.peek_time().astype(np.int64)) // self.step != period
+
+    def has_next(self) -> bool:
+        return self.pending is not None
+
+    def peek_time(self) -> np.datetime64:
+        return np.datetime64(self.pending[0] * self.step, 'us')
+
+    def advance(self):
+        slot = self._next_slot()
+        pending = self.pending
+        self.buffer['datetime'][slot] = np.datetime64(pending[0] * self.step, 'us')
+        for name, value in zip(COLUMNS[1:], pending[1:]):
+            self.buffer[name][slot] = value
+        self.pending = None
+
+    def get_state(self) -> tuple:
+        return self._get_buffer(), list(self.pending) if self.pending is not None else None
+
+    def set_state(self, state: tuple):
+        bars, pending = state
+        self._set_buffer(bars)
+        self.pending = list(pending) if pending is not None else None
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+from analysis.timing import StageTimer
+from backtest import BackTest
+from events.events import MarketEvent
+
+if TYPE_CHECKING:
+    from generators.strategy import Strategy
+    from handlers.datahandler import DataHandler
+
+class MultiBackTest(object):
+    """A MultiBackTest runs several backtests over a single replay of their shared DataHandler, so the bars
+    are loaded, merged and decoded, and the indicators updated, once per bar instead of once per strategy.
+
+    Each backtest keeps its own event queue, strategy, portfolio and execution handler, so orders, fills
+    and accounting never mix. On each bar, every backtest processes the same MarketEvent in turn, and the
+    event is only released to the pool once every backtest is done with it. Strategies sharing the data
+    handler also share its indicators, so strategies attaching indicators with different parameters must
+    give them different names.
+
+    Attributes:
+        data_handler (DataHandler): The data handler replayed once for every backtest.
+        backtests (dict[str, BackTest]): A dictionary mapping each name to its backtest.
+        max_trading_periods (int): The maximum number of periods to replay.
+        periods (int): The number of trading periods replayed so far.
+        timer (StageTimer): The time spent updating the data handler in the last instrumented run, None if not instrumented.
+    """
+    def __init__(self, data_handler: DataHandler, backtests: dict[str, BackTest], max_trading_periods: int = float('inf')):
+        """Constructor method
+
+        Args:
+            data_handler (DataHandler): The data handler every backtest was built with.
+            backtests (dict[str, BackTest]): A dictionary mapping each name to its backtest.
+            max_trading_periods (int, optional): The maximum number of periods to replay. Defaults to float('inf').
+        """
+        # Each component is wired to the queue of its backtest, so none can belong to two backtests
+        seen = {'event_queue': set(), 'strategy': set(), 'portfolio': set(), 'execution_handler': set()}
+        for name, backtest in backtests.items():
+            if backtest.data_handler is not data_handler:
+                raise ValueError(f"Backtest {name} does not use the shared data handler.")
+            for component, ids in seen.items():
+                key = id(getattr(backtest, component))
+                if key in ids:
+                    raise ValueError(f"Backtest {name} shares its {component.replace('_', ' ')} with another backtest.")
+                ids.add(key)
+
+        self.data_handler = data_handler
+        self.backtests = dict(backtests)
+        self.max_trading_periods = max_trading_periods
+        self.periods = 0
+        self.timer = None
+
+    @classmethod
+    def from_strategies(cls, symbols_list: list[str], strategies: dict[str, Strategy], data_handler: DataHandler,
+                        max_trading_periods: int = float('inf'), **backtest_args) -> MultiBackTest:
+        """Builds a BackTest with its own event queue for each strategy, all over the same data handler.
+
+        Args:
+            symbols_list (list[str]): The symbols traded by the backtests.
+            strategies (dict[str, Strategy]): A dictionary mapping each name to its strategy, built over data_handler.
+            data_handler (DataHandler): The data handler replayed once for every strategy.
+            max_trading_periods (int, optional): The maximum number of periods to replay. Defaults to float('inf').
+            **backtest_args: Extra keyword arguments passed to each BackTest, such as initial_capital or event_pool.
+
+        Returns:
+            MultiBackTest: The backtests, ready to run.
+        """
+        backtests = {name: BackTest(symbols_list, strategy, data_handler, **backtest_args) for name, strategy in strategies.items()}
+        return cls(data_handler, backtests, max_trading_periods)
+
+    def run_backtest(self, instrument: bool = False):
+        """Runs the shared replay until the data handler is out of data or max_trading_periods is reached,
+        each bar being processed by every backtest in turn.
+
+        Args:
+            instrument (bool, optional): Whether to time each handler, the data handler in timer and the handlers
+                of each backtest in its own timer. Defaults to False.
+        """
+        update_data = self.data_handler.update
+
+        self.timer = StageTimer() if instrument else None
+        if self.timer:
+            update_data = self.timer.wrap('DataHandler.update', update_data)
+
+        pipelines = []
+        for backtest in self.backtests.values():
+            backtest.timer = StageTimer() if instrument else None
+            pipelines.append((backtest._process_bar, backtest._handlers(backtest.timer)))
+
+        event_pool = getattr(self.data_handler, 'event_pool', None)
+        release = event_pool.release if event_pool else None
+        start = time.perf_counter()
+
+        while self.data_handler.continue_backtest and self.periods < self.max_trading_periods:
+            market_event = update_data()
+            if not self.data_handler.continue_backtest:
+                break
+
+            self.periods += 1
+            if market_event is None:
+                market_event = MarketEvent()
+            for process_bar, handlers in pipelines:
+                process_bar(market_event, handlers)
+            if release:
+                release(market_event)
+
+        if self.timer:
+            self.timer.total_time = time.perf_counter() - start
+            for backtest in self.backtests.values():
+                backtest.timer.total_time = self.timer.total_time
+
+    def summary(self) -> dict[str, dict]:
+        """Collects the performance statistics of every backtest.
+
+        Returns:
+            dict[str, dict]: A dictionary mapping each name to the PerformanceStatistics summary of its portfolio.
+        """
+        return {name: backtest.portfolio.statistics.summary() for name, backtest in self.backtests.items()}
+
+    def print_results(self):
+        """Prints the results of every backtest to the console, followed by the time spent replaying the
+        data for an instrumented run.
+        """
+        for name, backtest in self.backtests.items():
+            print(f"==== {name} ====")
+            backtest.print_results()
+
+        if self.timer:
+            print("==== Shared replay ====")
+            self.timer.print_report(sum(backtest.events for backtest in self.backtests.values()))
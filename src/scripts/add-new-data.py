@@ -1,35 +1,38 @@
-from dotenv import load_dotenv
-import yfinance as yf
-import mysql.connector
+from concurrent.futures import ThreadPoolExecutor
 import os
 import datetime
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from handlers.bars import read_csv_rows
 
 
 # This script is used to add new data to the database. Precisely, it adds minutely data
-# from the given futures symbol to the MySQL database. The data is fetched from Yahoo Finance.
+# from the given futures symbols to the MySQL database. The data is fetched from Yahoo Finance,
+# or from CSV files laid out like the tables.
 
-class AddData(object):
-    """AddData class is used to add new financial data to the database.
-    """    
-    def __init__(self):
-        """Constructor function for AddData class.
-        """        
-        load_dotenv()
+class YahooSource(object):
+    """YahooSource fetches the minutely data of the last days from Yahoo Finance.
+    """
+    def __init__(self, days: int = 6):
+        """Constructor function for YahooSource class.
 
-    def add_new_data(self, symbol: str, table_name: str) -> None:  
-        """Method for gathering and adding new financial data to the database.
+        :param int days: Number of past days to fetch, Yahoo Finance serves at most 7 days of minutely data.
+        """
+        self.days = days
+
+    def __call__(self, symbol: str) -> list:
+        """Fetches the rows of a symbol.
 
         :param str symbol: Symbol of equity or futures to fetch data for.
-        :param str table_name: Name of table to insert new data into.
-        """        
-        futures_db = mysql.connector.connect(
-            host = os.environ['DB_HOST'],
-            user = os.environ['DB_USER'],
-            password = os.environ['DB_PASS'],
-            database = os.environ['FUTURES_DB']
-            )
-        
-        start_date = datetime.datetime.today() - datetime.timedelta(days=6)
+        :return: Rows laid out as (entry_time, open, high, low, close, adj_close, volume).
+        """
+        import yfinance as yf
+
+        start_date = datetime.datetime.today() - datetime.timedelta(days=self.days)
         end_date = datetime.datetime.today() + datetime.timedelta(days=1)
 
         start_date = start_date.strftime('%Y-%m-%d')
@@ -40,16 +43,156 @@ class AddData(object):
 
         data['Datetime'] = data['Datetime'].apply(lambda x : x.strftime('%Y-%m-%d %H:%M:%S'))
 
-        add_data = (f"""INSERT IGNORE INTO {table_name}(entry_time, open_price, high_price, low_price, close_price, adj_price, volume) VALUES (%s, %s, %s, %s, %s, %s, %s)""")
+        # Box values as Python objects, which every database driver can convert
+        return data.to_numpy(dtype=object).tolist()
+
+class CSVSource(object):
+    """CSVSource reads the rows of a symbol from <directory>/<symbol>.csv, with the columns
+    entry_time, open, high, low, close, adj_close and volume, and an optional header row.
+    """
+    def __init__(self, directory: str):
+        """Constructor function for CSVSource class.
+
+        :param str directory: Directory holding one CSV file per symbol.
+        """
+        self.directory = directory
+
+    def __call__(self, symbol: str) -> list:
+        """Reads the rows of a symbol.
+
+        :param str symbol: Symbol to read data for.
+        :return: Rows laid out as (entry_time, open, high, low, close, adj_close, volume).
+        :raises ValueError: If a row other than the header is too short or not numeric.
+        """
+        return list(read_csv_rows(os.path.join(self.directory, f'{symbol}.csv')))
+
+def connect_mysql():
+    """Opens a connection to the futures database configured in the environment.
+
+    :return: A MySQL connection.
+    """
+    import mysql.connector
+
+    return mysql.connector.connect(
+        host = os.environ['DB_HOST'],
+        user = os.environ['DB_USER'],
+        password = os.environ['DB_PASS'],
+        database = os.environ['FUTURES_DB']
+        )
+
+class AddData(object):
+    """AddData class is used to add new financial data to the database.
+
+    Rows are inserted with executemany in batches, several symbols are loaded concurrently over a small
+    pool of connections, and rows already in a table are skipped as with INSERT IGNORE.
+    """
+    def __init__(self, source=None, connect=None, dialect: str = 'mysql', batch_size: int = 5000, pool_size: int = 4):
+        """Constructor function for AddData class.
+
+        :param source: Callable returning the rows of a symbol, defaults to a YahooSource.
+        :param connect: Callable opening a database connection, defaults to the MySQL database configured in the environment.
+            Connections may be used from several threads, one at a time (use check_same_thread=False with sqlite3).
+        :param str dialect: 'mysql' or 'sqlite', selecting the placeholders and the INSERT IGNORE syntax.
+        :param int batch_size: Number of rows sent per executemany call.
+        :param int pool_size: Number of connections, and so of symbols loaded concurrently.
+        """
+        if connect is None:
+            from dotenv import load_dotenv
+            load_dotenv()
+            connect = connect_mysql
+
+        if dialect not in ('mysql', 'sqlite'):
+            raise ValueError(f"Unknown dialect {dialect}, expected 'mysql' or 'sqlite'.")
+
+        self.source = source if source is not None else YahooSource()
+        self.connect = connect
+        self.dialect = dialect
+        self.batch_size = batch_size
+        self.pool_size = pool_size
+        self.pool = queue.Queue()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def __insert_statement(self, table_name: str) -> str:
+        if self.dialect == 'sqlite':
+            return f"""INSERT OR IGNORE INTO {table_name}(entry_time, open_price, high_price, low_price, close_price, adj_price, volume) VALUES (?, ?, ?, ?, ?, ?, ?)"""
+        return f"""INSERT IGNORE INTO {table_name}(entry_time, open_price, high_price, low_price, close_price, adj_price, volume) VALUES (%s, %s, %s, %s, %s, %s, %s)"""
+
+    def __acquire(self):
+        """Takes a connection from the pool, opening a new one while the pool is not full.
+        """
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            if len(self.connections) < self.pool_size:
+                connection = self.connect()
+                self.connections.append(connection)
+                return connection
+        return self.pool.get()
+
+    def add_new_data(self, symbol: str, table_name: str) -> int:
+        """Method for gathering and adding new financial data to the database.
+
+        :param str symbol: Symbol of equity or futures to fetch data for.
+        :param str table_name: Name of table to insert new data into.
+        :return: Number of rows sent to the database, including rows skipped as duplicates.
+        """
+        rows = self.source(symbol)
+        add_data = self.__insert_statement(table_name)
+
+        connection = self.__acquire()
+        curs = None
+        try:
+            curs = connection.cursor()
+            for start in range(0, len(rows), self.batch_size):
+                curs.executemany(add_data, rows[start:start + self.batch_size])
+            connection.commit()
+        except:
+            # Roll back the batches already sent, or the next symbol using the connection would commit them
+            connection.rollback()
+            raise
+        finally:
+            if curs is not None:
+                curs.close()
+            self.pool.put(connection)
+
+        return len(rows)
+
+    def add_many(self, pairs: list) -> dict:
+        """Adds the data of several symbols concurrently, printing the throughput of each.
+
+        :param list pairs: (symbol, table_name) pairs to load.
+        :return: Dictionary mapping each (symbol, table_name) pair to the number of rows sent.
+        """
+        def load(pair):
+            start = time.perf_counter()
+            rows = self.add_new_data(*pair)
+            elapsed = time.perf_counter() - start
+            print(f'{pair[0]} -> {pair[1]}: {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)')
+            return rows
 
-        curs = futures_db.cursor()
-        for row in data.itertuples(index=False, name=None):
-            curs.execute(add_data, row)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            rows = list(executor.map(load, pairs))
+        elapsed = time.perf_counter() - start
 
-        futures_db.commit()
+        counts = dict(zip(map(tuple, pairs), rows))
+        total = sum(rows)
+        print(f'Total: {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/s)')
+        return counts
 
-        curs.close()
-        futures_db.close()
+    def close(self):
+        """Closes every connection of the pool.
+        """
+        for connection in self.connections:
+            connection.close()
+        self.connections = []
+        self.pool = queue.Queue()
 
-data_adder = AddData()
-data_adder.add_new_data('MNQ=F', 'mnq')
\ No newline at end of file
+if __name__ == '__main__':
+    data_adder = AddData()
+    data_adder.add_many([('MNQ=F', 'mnq')])
+    data_adder.close()
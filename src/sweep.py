@@ -0,0 +1,176 @@
+import itertools
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import BackTest
+from handlers.bars import COLUMNS, Columns
+from handlers.datahandler import ArrayDataHandler, FeedDataHandler
+
+class SharedBars(object):
+    """SharedBars copies the column arrays of every symbol into shared memory once, so worker processes
+    can attach to them by name instead of loading or receiving their own copy of the data.
+
+    Attributes:
+        spec (dict): A dictionary mapping each symbol and column to the (name, shape, dtype) of its block.
+        blocks (list): The shared memory blocks owned by this object.
+    """
+    def __init__(self, bars: dict[str, Columns]):
+        """Constructor method
+
+        Args:
+            bars (dict[str, Columns]): A dictionary mapping each symbol to its column arrays.
+        """
+        self.spec = {}
+        self.blocks = []
+
+        for symbol, columns in bars.items():
+            self.spec[symbol] = {}
+            for name in COLUMNS:
+                array = columns[name]
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+
+                self.blocks.append(block)
+                self.spec[symbol][name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        """Releases and removes the shared memory blocks.
+        """
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+def attach_bars(spec: dict) -> tuple[dict[str, Columns], list]:
+    """Attaches to the blocks described by a SharedBars spec.
+
+    Args:
+        spec (dict): The spec of a SharedBars object.
+
+    Returns:
+        tuple[dict[str, Columns], list]: The column arrays of each symbol, as views of the shared memory,
+        and the attached blocks, which must be kept alive as long as the arrays are used.
+    """
+    bars = {}
+    blocks = []
+
+    for symbol, columns in spec.items():
+        bars[symbol] = {}
+        for name, (block_name, shape, dtype) in columns.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            array.flags.writeable = False
+            bars[symbol][name] = array
+            blocks.append(block)
+
+    return bars, blocks
+
+def slice_bars(bars: dict[str, Columns], start: np.datetime64 = None, end: np.datetime64 = None) -> dict[str, Columns]:
+    """Restricts bars to a time range, as views of the original arrays.
+
+    Args:
+        bars (dict[str, Columns]): A dictionary mapping each symbol to its column arrays, sorted by time.
+        start (np.datetime64, optional): The earliest bar to keep, None for no limit. Defaults to None.
+        end (np.datetime64, optional): Only bars strictly before this time are kept, None for no limit. Defaults to None.
+
+    Returns:
+        dict[str, Columns]: A dictionary mapping each symbol to views of its bars within the range.
+    """
+    sliced = {}
+    for symbol, columns in bars.items():
+        times = columns['datetime']
+        first = 0 if start is None else np.searchsorted(times, start, side='left')
+        last = len(times) if end is None else np.searchsorted(times, end, side='left')
+        sliced[symbol] = {name: values[first:last] for name, values in columns.items()}
+    return sliced
+
+# Per worker state, set by the pool initializer
+_worker_bars = None
+_worker_blocks = None
+
+def _init_worker(spec: dict):
+    global _worker_bars, _worker_blocks
+    _worker_bars, _worker_blocks = attach_bars(spec)
+
+def _run_backtest(strategy_class: type, params: dict, missing: str, backtest_args: dict,
+                  bounds: tuple = (None, None), equity: bool = False) -> dict:
+    bars = _worker_bars if bounds == (None, None) else slice_bars(_worker_bars, *bounds)
+    data_handler = ArrayDataHandler(bars, missing)
+    strategy = strategy_class(data_handler, None, **params)
+
+    backtest = BackTest(list(bars), strategy, data_handler, **backtest_args)
+    backtest.run_backtest()
+
+    result = {
+        'params': params,
+        **backtest.portfolio.statistics.summary(),
+        'trades': backtest.fills
+    }
+    if equity:
+        periods = backtest.portfolio.periods
+        result['timestamps'] = backtest.portfolio.timestamps[:periods].copy()
+        result['equity_curve'] = backtest.portfolio.equity_curve.copy()
+    return result
+
+class ParameterSweep(object):
+    """A ParameterSweep runs a BackTest of a strategy class for every combination of a parameter grid,
+    spread over a pool of processes. The bars are placed in shared memory once and every worker replays
+    them from there, so no worker reloads or copies the data.
+
+    Strategies are built as strategy_class(data_handler, event_queue, **params), so strategy_class must
+    be importable by the worker processes.
+
+    Attributes:
+        strategy_class (type): The Strategy subclass to run.
+        param_grid (dict[str, list]): A dictionary mapping each parameter name to the values to try.
+        bars (dict[str, Columns]): A dictionary mapping each symbol to its column arrays.
+        missing (str): The missing bar policy of the data handlers built by the workers.
+        max_workers (int): The number of worker processes, None for one per core.
+        backtest_args (dict): Extra keyword arguments passed to each BackTest.
+    """
+    def __init__(self, strategy_class: type, param_grid: dict[str, list], data_handler: FeedDataHandler,
+                 max_workers: int = None, **backtest_args):
+        """Constructor method
+
+        Args:
+            strategy_class (type): The Strategy subclass to run.
+            param_grid (dict[str, list]): A dictionary mapping each parameter name to the values to try.
+            data_handler (FeedDataHandler): The data handler holding the bars, which must be fully loaded in memory.
+            max_workers (int, optional): The number of worker processes. Defaults to None, one per core.
+            **backtest_args: Extra keyword arguments passed to each BackTest, such as initial_capital.
+        """
+        self.bars = data_handler.full_bars()
+
+        self.strategy_class = strategy_class
+        self.param_grid = param_grid
+        self.missing = data_handler.missing
+        self.max_workers = max_workers
+        self.backtest_args = backtest_args
+
+    def combinations(self) -> list[dict]:
+        """Lists every combination of the parameter grid.
+
+        Returns:
+            list[dict]: One dictionary of keyword arguments per combination.
+        """
+        names = list(self.param_grid)
+        return [dict(zip(names, values)) for values in itertools.product(*self.param_grid.values())]
+
+    def run(self) -> Iterator[dict]:
+        """Runs every combination, yielding the results as they finish.
+
+        Yields:
+            dict: The params, the PerformanceStatistics summary and the number of trades of a finished run.
+        """
+        shared = SharedBars(self.bars)
+        try:
+            with ProcessPoolExecutor(self.max_workers, initializer=_init_worker, initargs=(shared.spec,)) as executor:
+                futures = [executor.submit(_run_backtest, self.strategy_class, params, self.missing, self.backtest_args)
+                           for params in self.combinations()]
+                for future in as_completed(futures):
+                    yield future.result()
+        finally:
+            shared.close()
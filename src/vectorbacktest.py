@@ -0,0 +1,96 @@
+import numpy as np
+
+from generators.strategy import VectorStrategy
+from handlers.datahandler import FeedDataHandler
+
+class VectorizedBackTest(object):
+    """A VectorizedBackTest runs a VectorStrategy over the full price arrays of a data handler in a single
+    vectorized pass, instead of dispatching events bar by bar.
+
+    Orders are filled at the close of the bar they are made on, with the same commission and fill cost as
+    the event-driven BackTest, so both give the same results for the same signals.
+
+    Attributes:
+        bars (dict[str, Columns]): A dictionary mapping each symbol to its full column arrays.
+        positions (dict[str, np.ndarray]): The positions held by the strategy after each bar of each symbol.
+        timeline (np.ndarray): The union of the bar times of every symbol.
+        cash (np.ndarray): The cash balance at each time of the timeline.
+        holdings (np.ndarray): The market value of the positions at each time of the timeline.
+        equity_curve (np.ndarray): The total value of the portfolio at each time of the timeline.
+        trades (int): The number of fills made over the run.
+    """
+    def __init__(self,
+                 strategy: VectorStrategy,
+                 data_handler: FeedDataHandler,
+                 initial_capital: float = 100000.0,
+                 commission: float = 0,
+                 fill_cost: float = 0.87,
+                 contract_value: float = 1
+                 ):
+        """Constructor method
+
+        Args:
+            strategy (VectorStrategy): The strategy to run.
+            data_handler (FeedDataHandler): The data handler holding the bars, which must be fully loaded in memory.
+            initial_capital (float, optional): The starting cash balance. Defaults to 100000.0.
+            commission (float, optional): The commission as a fraction of the traded value. Defaults to 0.
+            fill_cost (float, optional): The flat fee paid per contract traded. Defaults to 0.87.
+            contract_value (float, optional): The value of a one point move of one contract. Defaults to 1.
+        """
+        self.bars = data_handler.full_bars()
+
+        self.strategy = strategy
+        self.initial_capital = initial_capital
+        self.commission = commission
+        self.fill_cost = fill_cost
+        self.contract_value = contract_value
+
+        self.positions = {}
+        self.timeline = None
+        self.cash = None
+        self.holdings = None
+        self.equity_curve = None
+        self.trades = 0
+
+    def run_backtest(self):
+        """Computes the fills, fees, cash, holdings and equity curve of the strategy over the full history.
+        """
+        self.positions = self.strategy.calculate_positions(self.bars)
+        self.timeline = np.unique(np.concatenate([columns['datetime'] for columns in self.bars.values()]))
+
+        self.cash = np.full(len(self.timeline), self.initial_capital, dtype=np.float64)
+        self.holdings = np.zeros(len(self.timeline), dtype=np.float64)
+        self.trades = 0
+
+        for symbol, position in self.positions.items():
+            columns = self.bars[symbol]
+            position = np.asarray(position)
+            close = columns['close']
+
+            quantity = np.diff(position, prepend=0)
+            value = quantity * close * self.contract_value
+            fees = np.abs(value) * self.commission + np.abs(quantity) * self.fill_cost
+
+            symbol_cash = np.cumsum(-value - fees)
+            symbol_holdings = position * close * self.contract_value
+
+            # Carry the latest value of the symbol forward onto the timeline
+            index = np.searchsorted(columns['datetime'], self.timeline, side='right') - 1
+            started = index >= 0
+            self.cash[started] += symbol_cash[index[started]]
+            self.holdings[started] += symbol_holdings[index[started]]
+
+            self.trades += int(np.count_nonzero(quantity))
+
+        self.equity_curve = self.cash + self.holdings
+
+    def print_results(self):
+        """Prints a summary of the backtest to the console, including final cash, total value and positions.
+        """
+        if self.equity_curve is None or not len(self.equity_curve):
+            print('No results, run_backtest has not been called or there was no data.')
+            return
+
+        positions = {symbol: int(position[-1]) for symbol, position in self.positions.items() if len(position)}
+        print(f'Portfolio Summary: Cash={self.cash[-1]}, Total Value={self.equity_curve[-1]},\nPositions:{positions}')
+        print(f'Periods={len(self.timeline)}, Fills={self.trades}')
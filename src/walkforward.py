@@ -0,0 +1,145 @@
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from handlers.datahandler import FeedDataHandler
+from sweep import ParameterSweep, SharedBars, _init_worker, _run_backtest
+
+def final_equity(result: dict) -> float:
+    """The default walk-forward objective, maximizing the final value of the portfolio."""
+    return result['final_equity']
+
+class WalkForward(ParameterSweep):
+    """A WalkForward optimizes a strategy on rolling in-sample windows and tests the best parameters of
+    each window on the out-of-sample window following it, then stitches the out-of-sample equity curves
+    into a single curve.
+
+    Windows are counted in bars of the merged timeline of every symbol. The bars are placed in shared
+    memory once, and every run replays a slice of them, as views, so no window copies or reloads the
+    data. The in-sample runs of every window and parameter combination are spread over one pool of
+    processes, followed by the out-of-sample runs of every window.
+
+    Each run starts from the initial capital without any history before its window, so strategies
+    needing a warm up period only start trading part way into each window.
+
+    The walk-forward is run with walk_forward(), while run() is still the full period sweep of ParameterSweep.
+
+    Attributes:
+        in_sample (int): The number of bars each in-sample window spans.
+        out_of_sample (int): The number of bars each out-of-sample window spans.
+        step (int): The number of bars windows move forward by.
+        anchored (bool): Whether every in-sample window starts at the first bar.
+        objective (Callable[[dict], float]): The score maximized when choosing the parameters of a window.
+    """
+    def __init__(self, strategy_class: type, param_grid: dict[str, list], data_handler: FeedDataHandler,
+                 in_sample: int, out_of_sample: int, step: int = None, anchored: bool = False,
+                 objective: Callable[[dict], float] = final_equity, max_workers: int = None, **backtest_args):
+        """Constructor method
+
+        Args:
+            strategy_class (type): The Strategy subclass to run.
+            param_grid (dict[str, list]): A dictionary mapping each parameter name to the values to try.
+            data_handler (FeedDataHandler): The data handler holding the bars, which must be fully loaded in memory.
+            in_sample (int): The number of bars each in-sample window spans.
+            out_of_sample (int): The number of bars each out-of-sample window spans.
+            step (int, optional): The number of bars windows move forward by. Defaults to None, out_of_sample.
+            anchored (bool, optional): Whether every in-sample window starts at the first bar. Defaults to False.
+            objective (Callable[[dict], float], optional): The score maximized when choosing the parameters of a
+                window, computed from the result of a run. Defaults to final_equity.
+            max_workers (int, optional): The number of worker processes. Defaults to None, one per core.
+            **backtest_args: Extra keyword arguments passed to each BackTest, such as initial_capital.
+        """
+        super().__init__(strategy_class, param_grid, data_handler, max_workers, **backtest_args)
+        self.in_sample = in_sample
+        self.out_of_sample = out_of_sample
+        self.step = step if step is not None else out_of_sample
+        self.anchored = anchored
+        self.objective = objective
+
+    def windows(self) -> list[tuple]:
+        """Splits the merged timeline of every symbol into windows.
+
+        Returns:
+            list[tuple]: One (in-sample start, in-sample end, out-of-sample end) tuple of times per window,
+            each window ending strictly before its end time, None for the end of the data.
+        """
+        timeline = np.unique(np.concatenate([columns['datetime'] for columns in self.bars.values()]))
+
+        def time_at(index: int):
+            return timeline[index] if index < len(timeline) else None
+
+        windows = []
+        start = 0
+        while start + self.in_sample < len(timeline):
+            split = start + self.in_sample
+            windows.append((timeline[0] if self.anchored else timeline[start], time_at(split), time_at(split + self.out_of_sample)))
+            start += self.step
+        return windows
+
+    def walk_forward(self) -> dict:
+        """Runs the in-sample optimization and out-of-sample test of every window.
+
+        Returns:
+            dict: The windows, a list holding the in_sample and out_of_sample bounds, the chosen params,
+            and the in_sample_result and out_of_sample_result of each window, and the timestamps and
+            equity_curve of the stitched out-of-sample runs.
+        """
+        windows = self.windows()
+        combinations = self.combinations()
+        initial_capital = self.backtest_args.get('initial_capital', 100000.0)
+
+        shared = SharedBars(self.bars)
+        try:
+            with ProcessPoolExecutor(self.max_workers, initializer=_init_worker, initargs=(shared.spec,)) as executor:
+                in_sample = [[executor.submit(_run_backtest, self.strategy_class, params, self.missing, self.backtest_args, (start, split))
+                              for params in combinations] for start, split, _ in windows]
+
+                best = []
+                for futures in in_sample:
+                    results = [future.result() for future in futures]
+                    best.append(max(results, key=self.objective))
+
+                out_of_sample = [executor.submit(_run_backtest, self.strategy_class, result['params'], self.missing,
+                                                 self.backtest_args, (split, end), True)
+                                 for result, (_, split, end) in zip(best, windows)]
+                tests = [future.result() for future in out_of_sample]
+        finally:
+            shared.close()
+
+        # Chain the out-of-sample runs, each adding its profit to the final equity of the previous one.
+        # With a step shorter than out_of_sample, only the bars past the previous run are kept.
+        timestamps = []
+        equity_curves = []
+        level = initial_capital
+        last_time = None
+        for test in tests:
+            test_times = test['timestamps']
+            test_equity = test['equity_curve']
+            base = initial_capital
+            if last_time is not None:
+                kept = test_times > last_time
+                dropped = np.flatnonzero(~kept)
+                if len(dropped):
+                    base = test_equity[dropped[-1]]
+                test_times = test_times[kept]
+                test_equity = test_equity[kept]
+
+            stitched = level + test_equity - base
+            timestamps.append(test_times)
+            equity_curves.append(stitched)
+            if len(stitched):
+                level = stitched[-1]
+                last_time = test_times[-1]
+
+        return {
+            'windows': [{
+                'in_sample': (start, split),
+                'out_of_sample': (split, end),
+                'params': result['params'],
+                'in_sample_result': result,
+                'out_of_sample_result': {key: value for key, value in test.items() if key not in ('timestamps', 'equity_curve')}
+            } for (start, split, end), result, test in zip(windows, best, tests)],
+            'timestamps': np.concatenate(timestamps) if timestamps else np.empty(0, dtype='datetime64[us]'),
+            'equity_curve': np.concatenate(equity_curves) if equity_curves else np.empty(0)
+        }